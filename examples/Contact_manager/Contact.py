@@ -61,9 +61,12 @@ def view_contacts():
 """
 Step 6: Define a function to search for a contact by name.
 The search is case-insensitive and uses a lambda filter.
+Lower-case the searched name once, outside the lambda: the lambda runs for
+every record, and name.lower() inside it would be recomputed each time.
 """
 def search_contact(name):
-    results = db.search(lambda x: x['name'].lower() == name.lower())
+    target = name.lower()
+    results = db.search(lambda x: x['name'].lower() == target)
     if results:
         print(f"\nFound Contact: {results[0]}")
     else:
@@ -74,7 +77,8 @@ Step 7: Define a function to delete a contact by name.
 If a record matches, it will be permanently removed from the database.
 """
 def delete_contact(name):
-    deleted = db.delete(lambda x: x['name'].lower() == name.lower())
+    target = name.lower()
+    deleted = db.delete(lambda x: x['name'].lower() == target)
     if deleted:
         print(f"Contact '{name}' deleted.")
     else:
@@ -59,9 +59,11 @@ def view_all():
 
 """
 Step 6: Define a function to search for a student by name.
+The name is lower-cased once, not once per record inside the lambda.
 """
 def search_student(name):
-    results = db.search(lambda x: x['name'].lower() == name.lower())
+    target = name.lower()
+    results = db.search(lambda x: x['name'].lower() == target)
     if results:
         print(f"\nRecords for {name}:")
         for r in results:
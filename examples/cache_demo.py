@@ -13,13 +13,14 @@ db = Database("cache_demo.json", password="demo123", cache_size=100)
 
 # Insert sample data
 print("Inserting 100 sample records...")
-for i in range(100):
-    db.insert({
-        "id": i,
-        "name": f"User_{i}",
-        "age": 20 + (i % 30),
-        "status": "active" if i % 2 == 0 else "inactive"
-    })
+with db.bulk():  # Write the file once instead of after every insert
+    for i in range(100):
+        db.insert({
+            "id": i,
+            "name": f"User_{i}",
+            "age": 20 + (i % 30),
+            "status": "active" if i % 2 == 0 else "inactive"
+        })
 print("✓ Data inserted\n")
 
 # Demo 1: Cache Miss vs Cache Hit
@@ -70,11 +71,17 @@ print("--- Demo 3: Cache Invalidation ---")
 db.find({"name": "User_1"})
 print(f"Before insert - Cache size: {db.get_cache_stats()['size']}")
 
-# Insert invalidates cache
+# Insert only invalidates the cached queries the new record matches
 db.insert({"id": 200, "name": "New_User", "age": 25, "status": "active"})
 print(
-    f"After insert - Cache size: {db.get_cache_stats()['size']} "
-    "(cache cleared)"
+    f"After unrelated insert - Cache size: {db.get_cache_stats()['size']} "
+    "(name=User_1 entry kept)"
+)
+
+db.insert({"id": 201, "name": "User_1", "age": 40, "status": "active"})
+print(
+    f"After matching insert - Cache size: {db.get_cache_stats()['size']} "
+    "(name=User_1 entry dropped)"
 )
 
 # Query again
@@ -85,11 +92,12 @@ print(f"After query - Cache size: {db.get_cache_stats()['size']}\n")
 print("--- Demo 4: Repeated Queries (1000x) ---")
 
 query = {"age": {"$gt": 30}}
+key = db.cache.make_key(query)  # Canonicalize the query once
 
 # First run (will use cache after first query)
 start = time.time()
 for _ in range(1000):
-    db.find(query)
+    db.find_cached(key, query)
 time_with_cache = time.time() - start
 print(f"With cache: {time_with_cache*1000:.2f}ms for 1000 queries")
 
@@ -111,40 +119,37 @@ print(f"Speedup: {speedup:.1f}x faster with caching\n")
 # Re-enable cache
 db.enable_cache()
 
-# Demo 5: LRU Eviction
-print("--- Demo 5: LRU Eviction ---")
+# Demo 5: LRU Eviction with TinyLFU admission
+print("--- Demo 5: LRU Eviction with TinyLFU Admission ---")
 
 # Create db with small cache
 small_cache_db = Database("lru_demo.json", password="demo", cache_size=3)
 
-for i in range(5):
-    small_cache_db.insert({"id": i, "value": i * 10})
+with small_cache_db.bulk():
+    for i in range(20):
+        small_cache_db.insert({"id": i, "value": i * 10})
 
-# Fill cache
-small_cache_db.find({"id": 1})
-small_cache_db.find({"id": 2})
-small_cache_db.find({"id": 3})
-print(
-    f"Cache size after 3 queries: "
-    f"{small_cache_db.get_cache_stats()['size']}"
-)
+# A few hot queries, each requested repeatedly
+for _ in range(3):
+    for i in range(3):
+        small_cache_db.find({"id": i})
 
-# Access id=1 (moves to most recent)
-small_cache_db.find({"id": 1})
+# A sequential scan of one-off queries
+for i in range(3, 20):
+    small_cache_db.find({"id": i})
 
-# Add new query (should evict id=2, the least recent)
-small_cache_db.find({"id": 4})
+stats = small_cache_db.get_cache_stats()
 print(
-    f"Cache size after 4th query: "
-    f"{small_cache_db.get_cache_stats()['size']} (LRU eviction)"
+    f"Cache size after scan: {stats['size']} "
+    f"({stats['admission_skipped']} one-off results not admitted)"
 )
 
-# Verify id=2 is not in cache (cache miss)
-stats_before = small_cache_db.get_cache_stats()['misses']
-small_cache_db.find({"id": 2})
-stats_after = small_cache_db.get_cache_stats()['misses']
-result = 'Cache miss (evicted)' if stats_after > stats_before else 'Cache hit'
-print(f"Query for id=2: {result}\n")
+# The hot queries survived the scan
+stats_before = small_cache_db.get_cache_stats()['hits']
+small_cache_db.find({"id": 0})
+stats_after = small_cache_db.get_cache_stats()['hits']
+result = 'Cache hit (kept)' if stats_after > stats_before else 'Cache miss'
+print(f"Query for id=0: {result}\n")
 
 # Final stats
 print("--- Final Cache Statistics ---")
@@ -3,7 +3,8 @@ Main JSONDatabase class
 """
 
 import os
-import copy
+import threading
+from contextlib import contextmanager
 
 from .storage import Storage
 from .schema import Schema
@@ -18,8 +19,57 @@ from .query_builder import QueryBuilder
 from .utils.logger import Logger
 
 
+def _apply_change(records, change):
+    """Replay one journaled change onto the loaded records."""
+    op = change["op"]
+    if op == "insert":
+        records.append(change["record"])
+    elif op == "insert_many":
+        records.extend(change["records"])
+    elif op == "update":
+        for position, values in change["changes"]:
+            records[position].update(values)
+    elif op == "delete":
+        drop = set(change["positions"])
+        records[:] = [
+            record for position, record in enumerate(records)
+            if position not in drop
+        ]
+    elif op == "batch":
+        for entry in change["changes"]:
+            _apply_change(records, entry)
+
+
+def _share_strings(records):
+    """
+    Make equal string values of the records share one object.
+
+    Each decoded record holds its own copy of repeated values such as
+    "active"; sharing them cuts memory on categorical columns and lets
+    equality checks succeed on identity.
+    """
+    seen = {}
+    for record in records:
+        for key, value in record.items():
+            if type(value) is str:
+                record[key] = seen.setdefault(value, value)
+
+
+def _same_value(a, b):
+    """Equal and of the same type, so 1 -> True or 1 -> 1.0 still counts as a change."""
+    return type(a) is type(b) and a == b
+
+
 class Database:
-    def __init__(self, path, password, cache_enabled=True, cache_size=100):
+    # The journal may always grow to this size before being compacted,
+    # even while the main file is still small
+    JOURNAL_MIN_BYTES = 64 * 1024
+    # Bumped by every write and dataset replacement, so an open
+    # transaction can tell whether the records changed under it
+    _generation = 0
+
+    def __init__(self, path, password, cache_enabled=True, cache_size=100,
+                 checkpoint_interval=100, share_strings=False):
         self.logger = Logger()
         self.path = path
         self.storage = Storage(path)
@@ -27,6 +77,20 @@ class Database:
         self.security = Security(password)
         self.indexer = Indexer()
         self.cache = QueryCache(max_size=cache_size, enabled=cache_enabled)
+        self._in_bulk = False
+        self._dirty = False
+        # Writes are appended to a journal; after checkpoint_interval
+        # entries, or once the journal outgrows half the main file, the
+        # whole dataset is rewritten and the journal dropped
+        self.checkpoint_interval = checkpoint_interval
+        # Deduplicate string values on load: less memory, slower load
+        self.share_strings = share_strings
+        # Serializes transaction commits; their journal sync happens
+        # outside it so concurrent commits can share one fsync
+        self._commit_lock = threading.Lock()
+        self._journal_size = 0
+        self._journal_bytes = 0
+        self._snapshot_bytes = 0
 
         # Initialize schema version tracking
         db_name = os.path.splitext(os.path.basename(path))[0]
@@ -44,9 +108,26 @@ class Database:
                 self.logger.error("WAL recovery failed")
 
         self.data = self.load()
-        self.query_engine = QueryEngine(self.data)
         self.logger.info("Database initialized")  # test logger
 
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, records):
+        """Replace the whole dataset, rebinding the indexer and query engine."""
+        self._generation += 1
+        if records is getattr(self, "_data", None):
+            # Edited in place (e.g. by a schema migration): the engine
+            # still points at this list, only its aggregates are stale
+            self.query_engine.invalidate_aggregates()
+        else:
+            self.query_engine = QueryEngine(records, self.indexer)
+        self._data = records
+        self.indexer.build(records)
+        self.schema.invalidate_indexes()
+
     def load(self):
         """Load database contents from storage with robust error handling.
 
@@ -54,42 +135,187 @@ class Database:
         - If the file does not exist: log a warning and return empty list.
         - If the file is empty: log a warning and return an empty list.
         - If decryption/parsing fails: log error and raise RuntimeError.
+
+        Changes journaled since the last checkpoint are replayed on top.
         """
         try:
             if not os.path.exists(self.storage.filepath):
                 self.logger.warn(
                     "Database file not found, initializing empty dataset"
                 )
-                return []
-
-            raw = self.storage.read()
-            if not raw:
-                self.logger.warn(
-                    "Database file is empty, initializing empty dataset"
-                )
-                return []
-
-            return self.security.decrypt(raw)
+                records = []
+            else:
+                raw = self.storage.read()
+                self._snapshot_bytes = len(raw)
+                if not raw:
+                    self.logger.warn(
+                        "Database file is empty, initializing empty dataset"
+                    )
+                    records = []
+                else:
+                    records = self.security.decrypt(raw)
+
+            entries = self.storage.read_journal()
+            for entry in entries:
+                _apply_change(records, self.security.decrypt(entry))
+            self._journal_size = len(entries)
+            self._journal_bytes = sum(len(entry) for entry in entries)
+            if self.share_strings:
+                _share_strings(records)
+            return records
         except Exception as e:
             self.logger.error(f"Failed to load database: {e}")
             raise RuntimeError("Database file is corrupt or unreadable") from e
 
     def save(self):
+        if self._in_bulk:
+            # Flushed once when the bulk() block exits
+            self._dirty = True
+            return
+        self.checkpoint()
+
+    def checkpoint(self):
+        """Write the whole dataset to the main file and drop the journal."""
+        self._generation += 1
         encrypted = self.security.encrypt(self.data)
         self.storage.write(encrypted)
-        self.query_engine = QueryEngine(self.data)
+        self._journal_size = 0
+        self._journal_bytes = 0
+        self._snapshot_bytes = len(encrypted)
+
+    def close(self):
+        """Fold any journaled changes into the main file."""
+        if self._journal_size:
+            self.checkpoint()
+        self.storage.close()
+
+    def _journal(self, change: dict):
+        """
+        Persist a single change by appending it to the journal, instead of
+        re-encrypting and rewriting the whole dataset.
+
+        Updates and deletes are journaled by record position, so replaying
+        them in order on load reproduces the dataset exactly. Entries only
+        reach the disk for sure at the next checkpoint or sync_journal().
+        """
+        self._generation += 1
+        if self._in_bulk:
+            self._dirty = True
+            return
+        entry = self.security.encrypt_record(change)
+        self.storage.append_journal(entry)
+        self._journal_size += 1
+        self._journal_bytes += len(entry)
+        if (self._journal_size >= self.checkpoint_interval
+                or self._journal_bytes > max(self._snapshot_bytes // 2,
+                                             self.JOURNAL_MIN_BYTES)):
+            self.checkpoint()
 
     def insert(self, record: dict):
         self.schema.validate(record, self.data)
         self.data.append(record)
-        self.logger.info(f"Inserted record: {record}")  # Logger Test
-        self.indexer.build(self.data)
-        self.cache.invalidate()  # Invalidate cache on insert
-        self.save()
+        self.logger.info("Inserted record: %s", record)  # Logger Test
+        self.indexer.add(record, len(self.data) - 1)
+        self.query_engine.notify_insert(record)
+        # Only queries the new record satisfies can change
+        self.cache.invalidate_records([record])
+        self._journal({"op": "insert", "record": record})
+
+    def insert_many(self, records):
+        """
+        Insert several records with a single cache invalidation and write.
+
+        The batch is all-or-nothing: if any record fails schema validation
+        (including a duplicate within the batch), none are inserted.
+
+        Args:
+            records (iterable): Records to insert
+
+        Returns:
+            int: Number of records inserted
+        """
+        records = list(records)
+        if not records:
+            return 0
+
+        start = len(self.data)
+        try:
+            for record in records:
+                self.schema.validate(record, self.data)
+                self.data.append(record)
+        except Exception:
+            del self.data[start:]
+            raise
+
+        self.logger.info("Inserted %d records", len(records))
+        for position, record in enumerate(records, start):
+            self.indexer.add(record, position)
+            self.query_engine.notify_insert(record)
+        self.cache.invalidate_records(records)
+        self._journal({"op": "insert_many", "records": records})
+        return len(records)
+
+    @contextmanager
+    def bulk(self):
+        """
+        Defer writing to disk until the block exits.
+
+        Every insert/update/delete normally re-encrypts and rewrites the
+        whole file. Inside a bulk() block they only change memory, and the
+        file is written once on exit (also when the block raises, so disk
+        matches memory).
+
+        Example:
+            with db.bulk():
+                for record in records:
+                    db.insert(record)
+        """
+        if self._in_bulk:
+            # Nested block, the outermost one flushes
+            yield self
+            return
+
+        self._in_bulk = True
+        try:
+            yield self
+        finally:
+            self._in_bulk = False
+            if self._dirty:
+                self._dirty = False
+                self.save()
 
     def find(self, query: dict):
+        """
+        Return the records matching the query.
+
+        An empty query returns all records without touching the cache or
+        the indexer. The returned list is the live dataset, not a copy;
+        don't modify it.
+        """
+        if not query:
+            return self.data
+        # Canonicalize the query once for both the cache probe and store
+        return self.find_cached(self.cache.make_key(query), query)
+
+    def find_cached(self, key, query: dict):
+        """
+        Run a query using a cache key computed ahead of time.
+
+        Hot loops that repeat the same query can skip re-canonicalizing it:
+
+            key = db.cache.make_key(query)
+            for _ in range(1000):
+                db.find_cached(key, query)
+
+        Args:
+            key: Result of db.cache.make_key(query)
+            query: The query dictionary
+
+        Returns:
+            list: Matching records
+        """
         # Try to get from cache first
-        cached_result = self.cache.get(query)
+        cached_result = self.cache.get(query, key)
         if cached_result is not None:
             return cached_result
 
@@ -97,24 +323,155 @@ class Database:
         result = self.indexer.query(query)
 
         # Store in cache
-        self.cache.set(query, result)
+        self.cache.set(query, result, key)
 
         return result
 
     def update(self, query, updates):
-        found = self.find(query)
-        for item in found:
-            item.update(updates)
-        self.cache.invalidate()  # Invalidate cache on update
-        self.save()
+        """
+        Apply updates to every record matching the query.
+
+        Records that already hold the given values are left alone; when no
+        record changes, nothing is invalidated or written.
+
+        Returns:
+            int: Number of records modified
+        """
+        # Go through the indexer, not find(): caching a result that is about
+        # to change would only cost a set() and an invalidation
+        changed = []
+        for pos in self.indexer.positions(query):
+            item = self.data[pos]
+            changes = {
+                key: value for key, value in updates.items()
+                if key not in item or not _same_value(item[key], value)
+            }
+            if changes:
+                changed.append((pos, changes))
+
+        if not changed:
+            return 0
+        before, after, fields, journal = self._update_positions(changed)
+        if not self.schema.unique_fields.isdisjoint(fields):
+            # The unique value sets still hold the old values
+            self.schema.invalidate_indexes()
+        # Only queries reading an updated field, and matching the record
+        # before or after the change, can see a different result
+        self.cache.invalidate_fields(fields, before + after)
+        self._journal({"op": "update", "changes": journal})
+        return len(after)
+
+    def _update_positions(self, changed):
+        """
+        Apply (position, changes) pairs in place and keep the indexer and
+        query engine in step.
+
+        Returns:
+            tuple: Before images, updated records, changed fields and the
+            journal changes
+        """
+        before = []
+        after = []
+        fields = set()
+        journal = []
+        for pos, changes in changed:
+            item = self.data[pos]
+            old = dict(item)
+            item.update(changes)
+            self.indexer.notify_update(
+                pos, {key: old[key] for key in changes if key in old}, changes
+            )
+            self.query_engine.notify_update(old, item)
+            before.append(old)
+            after.append(item)
+            fields.update(changes)
+            journal.append([pos, changes])
+        return before, after, fields, journal
 
     def delete(self, query):
-        self.data = [
-            d for d in self.data
-            if not all(d[k] == v for k, v in query.items())
-        ]
-        self.cache.invalidate()  # Invalidate cache on delete
-        self.save()
+        # Locate matches through the indexer (single equality conditions
+        # come straight from the inverted index)
+        positions = self.indexer.positions(query)
+        if not positions:
+            return
+        removed = self._remove_positions(positions)
+        self.schema.invalidate_indexes()
+        self.cache.invalidate_records(removed)
+        self._journal({"op": "delete", "positions": positions})
+
+    def _remove_positions(self, positions):
+        """
+        Delete the records at the given ascending positions, keeping the
+        indexer and query engine in step.
+
+        Returns:
+            list: The removed records
+        """
+        removed = [self.data[pos] for pos in positions]
+        if len(positions) == 1 or len(positions) <= len(self.data) // 10:
+            # Few matches: delete back to front so earlier positions hold
+            for pos in reversed(positions):
+                del self.data[pos]
+        else:
+            # One pass instead of a del (and list shift) per match; the list
+            # object is kept since the indexer and engine share it
+            drop = set(positions)
+            self.data[:] = [
+                record for pos, record in enumerate(self.data)
+                if pos not in drop
+            ]
+        self.indexer.remove(positions)
+        for record in removed:
+            self.query_engine.notify_delete(record)
+        return removed
+
+    def _apply_batch(self, updates, positions, records):
+        """
+        Apply a committed transaction's changes in place.
+
+        Only the touched records are re-indexed and dropped from the cache,
+        and the whole batch is journaled as a single entry, replayed
+        all-or-nothing. The caller makes it durable with
+        storage.sync_journal().
+
+        Args:
+            updates (list): (position, new image of the record) pairs
+            positions (list): Ascending positions to delete, after updates
+            records (list): Records to append, after deletes
+        """
+        entries = []
+        changed = []
+        # Appended records are picked up by the schema's unique value sets
+        # on their own, updated unique fields and deletes are not
+        stale = bool(positions)
+        for pos, image in updates:
+            item = self.data[pos]
+            changes = {
+                key: value for key, value in image.items()
+                if key not in item or not _same_value(item[key], value)
+            }
+            if changes:
+                changed.append((pos, changes))
+        if changed:
+            before, after, fields, journal = self._update_positions(changed)
+            stale = stale or not self.schema.unique_fields.isdisjoint(fields)
+            self.cache.invalidate_fields(fields, before + after)
+            entries.append({"op": "update", "changes": journal})
+        if positions:
+            self.cache.invalidate_records(self._remove_positions(positions))
+            entries.append({"op": "delete", "positions": positions})
+        if records:
+            start = len(self.data)
+            self.data.extend(records)
+            for position, record in enumerate(records, start):
+                self.indexer.add(record, position)
+                self.query_engine.notify_insert(record)
+            self.cache.invalidate_records(records)
+            entries.append({"op": "insert_many", "records": records})
+        if stale:
+            self.schema.invalidate_indexes()
+        if entries:
+            self._journal({"op": "batch", "changes": entries})
 
     # ----------- BUILT-IN QUERY FUNCTIONS ------------
     def min(self, column):
@@ -156,10 +513,17 @@ class Database:
         self.cache.disable()
 
     # ----------- TRANSACTION SUPPORT ------------
-    def transaction(self):
+    def transaction(self, deep=False):
         """
         Create a new transaction context.
 
+        Records are copied lazily, when the transaction first updates them.
+
+        Args:
+            deep (bool): Deep-copy the whole dataset up front, so changes
+                made outside the open transaction (or to nested values)
+                can't leak into it (default: False)
+
         Returns:
             Transaction: A new transaction instance
 
@@ -169,7 +533,7 @@ class Database:
                 txn.insert({"id": 2, "name": "Bob"})
                 # Both inserts committed atomically
         """
-        return Transaction(self)
+        return Transaction(self, deep=deep)
 
     # ----------- SCHEMA MIGRATION SUPPORT ------------
     def migrate_schema(self, migration_callback, migration_name=''):
@@ -180,6 +544,10 @@ class Database:
             migration_callback: Function that takes SchemaMigration instance
             migration_name: Optional description of the migration
 
+        Changes made through the SchemaMigration operations are rolled back
+        from an undo log. Touching migration.data directly works too, but
+        makes the migration deep-copy the records on first access.
+
         Raises:
             Exception: Re-raises any exception from migration after rollback
 
@@ -192,26 +560,36 @@ class Database:
         """
         self.logger.info(f"Starting schema migration: {migration_name}")
 
-        # Create deep copy backup before migration
-        backup_data = copy.deepcopy(self.data)
-        self.logger.info("Created backup of current data")
+        # Operations are applied in place and undone from the migration's
+        # own undo log on failure, instead of deep-copying the dataset
+        migration = SchemaMigration(self.data)
+        saving = False
 
         try:
-            # Create migration instance with current data
-            migration = SchemaMigration(self.data)
-
             # Execute migration callback
             migration_callback(migration)
 
+            # Fields the operations changed, None if the callback used
+            # migration.data directly
+            fields = migration.changed_fields()
+
             # Get migrated data
-            self.data = migration.get_data()
+            self.data = migration.result()
 
             # Increment schema version
             self.schema_version.increment_version(migration_name)
 
-            # Invalidate cache and save
-            self.cache.invalidate()
-            self.save()
+            # The records were migrated in place, so cached queries on
+            # other fields still hold the right records; untracked changes
+            # clear the whole cache. The file is rewritten once for the
+            # whole migration, and not at all if no record changed.
+            if fields is None:
+                self.cache.invalidate()
+            elif fields:
+                self.cache.invalidate_fields(fields)
+            if fields is None or fields:
+                saving = True
+                self.save()
 
             self.logger.info(
                 f"Migration complete. Schema version: {self.schema_version.get_version()}"
@@ -222,10 +600,14 @@ class Database:
             self.logger.error(f"Migration failed: {e}")
             self.logger.warn("Rolling back to previous state")
 
-            # Restore from backup
-            self.data = backup_data
+            # Restore the records touched by the migration. Unless the
+            # failure came from save() itself, nothing was written and the
+            # file still holds the restored state.
+            migration.rollback()
+            self.data = migration.result()
             self.cache.invalidate()
-            self.save()
+            if saving:
+                self.save()
 
             self.logger.info("Rollback complete, database restored to previous state")
             raise
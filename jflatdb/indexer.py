@@ -1,84 +1,564 @@
 """
 Indexing system
 """
+import bisect
+import functools
 import re
 
+
+def _like_pattern(op_value):
+    """Compile a SQL LIKE pattern: % for any chars, _ for single char."""
+    return _compile_like(str(op_value))
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_like(like):
+    # Cached so repeated queries (and per-record matches_condition calls
+    # during cache invalidation) don't rebuild the same regex
+    pattern = like.replace("%", ".*").replace("_", ".")
+    if like.startswith("%"):
+        # search() already tries every start; a leading .* only makes a
+        # failed search quadratic in the value length
+        while pattern.startswith(".*"):
+            pattern = pattern[2:]
+    else:
+        pattern = "^" + pattern
+    if like.endswith("%"):
+        while pattern.endswith(".*"):
+            pattern = pattern[:-2]
+    else:
+        pattern = pattern + "$"
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def _between_bounds(op_value):
+    if not isinstance(op_value, (list, tuple)) or len(op_value) != 2:
+        return None
+    return op_value
+
+
+# Operator -> (prepare(op_value) -> argument, test expression). The
+# expression tests item value v against the prepared argument x; it is
+# turned into a test function below and inlined by compile_plan.
+# Range operators never match a missing value.
+_OP_EXPRESSIONS = {
+    "$gt": (None, "v is not None and v > x"),
+    "$lt": (None, "v is not None and v < x"),
+    "$gte": (None, "v is not None and v >= x"),
+    "$lte": (None, "v is not None and v <= x"),
+    "$eq": (None, "v == x"),
+    "$ne": (None, "v != x"),
+    "$in": (None, "v in x"),
+    "$between": (
+        _between_bounds,
+        "x is not None and v is not None and x[0] <= v <= x[1]",
+    ),
+    "$like": (_like_pattern, "v is not None and x.search(str(v)) is not None"),
+}
+
+# Operator -> (prepare(op_value) -> argument, test(item_value, argument))
+_OPS = {
+    op: (prepare, eval(f"lambda v, x: {expression}"))
+    for op, (prepare, expression) in _OP_EXPRESSIONS.items()
+}
+
+
+# Operators a sorted numeric index answers exactly
+_RANGE_OPS = frozenset(("$gt", "$lt", "$gte", "$lte", "$between"))
+
+
+# Range operator -> (bisect function locating the bound, lower bound?)
+_BISECT = {
+    "$gt": (bisect.bisect_right, True),
+    "$gte": (bisect.bisect_left, True),
+    "$lt": (bisect.bisect_left, False),
+    "$lte": (bisect.bisect_right, False),
+}
+
+
+def _is_number(value):
+    """Values a numeric range index holds (NaN never satisfies a range)."""
+    # Exact types first: isinstance() is only needed for bools and
+    # other int/float subclasses, which are kept
+    kind = type(value)
+    if kind is int:
+        return True
+    if kind is float or isinstance(value, (int, float)):
+        return value == value
+    return False
+
+
+def _passes(tests, item_value):
+    for test, argument in tests:
+        try:
+            if not test(item_value, argument):
+                return False
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+def _bind_operators(ops, op_values):
+    """Pair the test of each known operator with its prepared argument."""
+    tests = []
+    for op, op_value in zip(ops, op_values):
+        entry = _OPS.get(op)
+        if entry is None:
+            continue  # Unknown operators are ignored
+        prepare, test = entry
+        tests.append((test, op_value if prepare is None else prepare(op_value)))
+    return tests
+
+
+def matches_condition(item, key, value):
+    """Check a single query condition against a record."""
+    item_value = item.get(key)
+    if isinstance(value, dict):
+        # Handle operator queries
+        return _passes(_bind_operators(value, value.values()), item_value)
+    else:
+        # Simple equality
+        return item_value == value
+
+
+def matches_query(item, conditions: dict):
+    """Check whether a record satisfies every condition of a query."""
+    return all(matches_condition(item, k, v) for k, v in conditions.items())
+
+
+def query_shape(conditions: dict):
+    """
+    Structure of a query with the literal values left out.
+
+    {"age": {"$gt": 30}, "name": "Bob"} -> (("age", ("$gt",)), ("name", None))
+    """
+    return tuple(
+        (key, tuple(value) if isinstance(value, dict) else None)
+        for key, value in conditions.items()
+    )
+
+
+def compile_plan(shape):
+    """
+    Compile a query shape into a plan.
+
+    The plan takes the literal values of a query of that shape (see
+    Indexer.compile) and returns a predicate over records. The predicate
+    is generated as Python source once per shape, with every condition
+    and operator test inlined, so records pay for the comparisons only.
+    """
+    params = []
+    body = ["def predicate(item):", "    get = item.get"]
+    binders = []
+    for i, (key, ops) in enumerate(shape):
+        params.append(f"k{i}")
+        if ops is None:
+            params.append(f"e{i}")
+            body.append(f"    if not get(k{i}) == e{i}: return False")
+            binders.append(None)
+            continue
+        known = [(j, op) for j, op in enumerate(ops) if op in _OPS]
+        binders.append(tuple((j, _OPS[op][0]) for j, op in known))
+        if not known:
+            continue  # Unknown operators are ignored
+        body.append(f"    v = get(k{i})")
+        body.append("    try:")
+        for j, op in known:
+            params.append(f"a{i}_{j}")
+            body.append(f"        x = a{i}_{j}")
+            body.append(f"        if not ({_OP_EXPRESSIONS[op][1]}): return False")
+        body.append("    except (TypeError, ValueError):")
+        body.append("        return False")
+    body.append("    return True")
+
+    source = "\n".join(
+        [f"def make({', '.join(params)}):"]
+        + ["    " + line for line in body]
+        + ["    return predicate"]
+    )
+    namespace = {}
+    exec(compile(source, "<query plan>", "exec"), namespace)
+    make = namespace["make"]
+    keys = [key for key, _ in shape]
+
+    def plan(values):
+        args = []
+        for key, binder, value in zip(keys, binders, values):
+            args.append(key)
+            if binder is None:
+                args.append(value)
+                continue
+            for j, prepare in binder:
+                args.append(value[j] if prepare is None else prepare(value[j]))
+        return make(*args)
+
+    return plan
+
+
+def compile_query(conditions: dict, plans=None, max_plans=256):
+    """
+    Return a predicate over records equivalent to matches_query().
+
+    Args:
+        conditions (dict): The query
+        plans (dict): Optional cache of compiled plans by query shape,
+            cleared once it holds max_plans shapes
+
+    Returns:
+        callable: predicate(record) -> bool
+    """
+    shape = query_shape(conditions)
+    plan = None if plans is None else plans.get(shape)
+    if plan is None:
+        plan = compile_plan(shape)
+        if plans is not None:
+            if len(plans) >= max_plans:
+                plans.clear()
+            plans[shape] = plan
+    return plan([
+        tuple(value.values()) if isinstance(value, dict) else value
+        for value in conditions.values()
+    ])
+
+
 class Indexer:
+    # Distinct query shapes kept in the plan cache before it is reset
+    MAX_PLANS = 256
+    # Equality postings are only intersected with the candidate set while
+    # they are at most this many times larger; beyond that checking the
+    # few candidates is cheaper than walking the postings
+    INTERSECT_RATIO = 16
+
     def __init__(self):
-        self.indexes = {}
+        self._indexes = {}
+        # Whether _indexes must be rebuilt from data before use
+        self._stale = False
+        self.data = []
+        self._plan_cache = {}
+        # Field -> (sorted numeric values, their positions), built on the
+        # first range query against the field
+        self._sorted = {}
 
-    def build(self, data: list, store_full=False):
+    def build(self, data: list):
         """
-        Build indexes for the dataset.
+        Index the dataset.
+
+        Posting lists hold the positions of the records in data. They are
+        only built on first use, so loading a database and appending to
+        it without querying never pays for indexing.
 
         Args:
             data (list): List of record dictionaries.
-            store_full (bool): If True, store full records; if False, store only indices.
         """
         self.data = data  # Store original dataset
-        self.indexes.clear()
+        self._indexes = {}
+        self._sorted.clear()
+        self._stale = True
+
+    @property
+    def indexes(self):
+        """Field -> value -> ascending positions of the records holding it."""
+        if self._stale:
+            self._stale = False
+            self._post_all()
+        return self._indexes
 
-        for idx, record in enumerate(data):
+    def _post_all(self):
+        """Fill the postings from the whole dataset in one pass."""
+        indexes = self._indexes
+        # Inlined _post(): no call per record, and no throwaway [] per
+        # value as setdefault() would allocate
+        for idx, record in enumerate(self.data):
             for key, value in record.items():
-                if key not in self.indexes:
-                    self.indexes[key] = {}
-                if value not in self.indexes[key]:
-                    self.indexes[key][value] = []
-                if store_full:
-                    # Store full record (original behavior)
-                    self.indexes[key][value].append(record)
+                values = indexes.get(key)
+                if values is None:
+                    values = indexes[key] = {}
+                try:
+                    postings = values.get(value)
+                except TypeError:
+                    # Unhashable values (lists, dicts) can't be indexed
+                    continue
+                if postings is None:
+                    values[value] = [idx]
                 else:
-                    # Store only index to save memory
-                    self.indexes[key][value].append(idx)
+                    postings.append(idx)
+
+    def _post(self, record: dict, position: int):
+        indexes = self._indexes
+        for key, value in record.items():
+            values = indexes.setdefault(key, {})
+            try:
+                postings = values.setdefault(value, [])
+            except TypeError:
+                # Unhashable values (lists, dicts) can't be indexed
+                continue
+            postings.append(position)
+
+    def add(self, record: dict, position: int):
+        """
+        Index a single record without rescanning the dataset.
+
+        Meant for appends: existing positions must stay valid. Sorted range
+        indexes already built are kept and extended.
+
+        Args:
+            record (dict): The record, already stored in the indexed data.
+            position (int): Its position in the indexed data.
+        """
+        if self._sorted:
+            for key, value in record.items():
+                sorted_index = self._sorted.get(key)
+                if sorted_index is not None and _is_number(value):
+                    # Appends keep the range index, O(log N) search + insert
+                    sorted_values, sorted_positions = sorted_index
+                    at = bisect.bisect_right(sorted_values, value)
+                    sorted_values.insert(at, value)
+                    sorted_positions.insert(at, position)
+        if not self._stale:
+            self._post(record, position)
+
+    def remove(self, positions: list):
+        """
+        Drop deleted records from the indexes without rescanning the data.
+
+        Postings after a removed record shift down by the number of
+        removed records before them. Postings that end up empty are
+        dropped; sorted range indexes are kept.
+
+        Args:
+            positions (list): Ascending positions the records had before
+                they were deleted from the indexed data.
+        """
+        if not positions:
+            return
+        removed = set(positions)
+        first = positions[0]
+
+        def shifted(pos):
+            return pos - bisect.bisect_left(positions, pos)
+
+        # Postings not built yet will be built from the updated data
+        for values in () if self._stale else self._indexes.values():
+            for value, postings in list(values.items()):
+                # Positions before the first removed record don't move
+                at = bisect.bisect_left(postings, first)
+                if at == len(postings):
+                    continue
+                postings[at:] = [
+                    shifted(pos) for pos in postings[at:] if pos not in removed
+                ]
+                if not postings:
+                    del values[value]
+
+        for sorted_values, sorted_positions in self._sorted.values():
+            kept = [
+                (value, shifted(pos))
+                for value, pos in zip(sorted_values, sorted_positions)
+                if pos not in removed
+            ]
+            sorted_values[:] = [value for value, _ in kept]
+            sorted_positions[:] = [pos for _, pos in kept]
+
+    def notify_update(self, position: int, old: dict, new: dict):
+        """
+        Move an updated record to the postings of its new field values.
+
+        Args:
+            position (int): Position of the record in the indexed data.
+            old (dict): Previous values of the changed fields; fields the
+                record didn't have are omitted.
+            new (dict): New values of the changed fields.
+        """
+        for key in new:
+            self._sorted.pop(key, None)
+        if self._stale:
+            return  # Built from the updated data on first use
+
+        for key, value in new.items():
+            values = self._indexes.setdefault(key, {})
+            if key in old:
+                try:
+                    if old[key] == value:
+                        continue
+                    postings = values.get(old[key])
+                except TypeError:
+                    postings = None
+                if postings is not None:
+                    postings.remove(position)
+                    if not postings:
+                        del values[old[key]]
+            try:
+                postings = values.setdefault(value, [])
+            except TypeError:
+                continue
+            # Keep positions ascending
+            bisect.insort(postings, position)
+
+    def compile(self, conditions: dict):
+        """
+        Return a predicate for the conditions, reusing the plan compiled
+        for earlier queries of the same shape.
+        """
+        return compile_query(conditions, self._plan_cache, self.MAX_PLANS)
 
     def query(self, conditions: dict, use_index=True):
-        # For correctness and simplicity, filter directly against data using all conditions
         if not conditions:
             return self.data
-        
-        def matches_condition(item, key, value):
-            item_value = item.get(key)
+
+        positions = self._indexed_positions(conditions) if use_index else None
+        if positions is not None:
+            return [self.data[pos] for pos in positions]
+
+        predicate = self.compile(conditions)
+        return [item for item in self.data if predicate(item)]
+
+    def positions(self, conditions: dict):
+        """
+        Return the positions (ascending) of records matching the conditions.
+
+        Equality conditions are answered by intersecting their posting
+        lists, smallest first. A numeric range condition selecting fewer
+        records than every equality instead picks the candidates through
+        the sorted index. Conditions not resolved through an index are
+        only checked against the candidates; queries with no indexable
+        condition scan the data.
+        """
+        positions = self._indexed_positions(conditions)
+        if positions is not None:
+            return positions
+        predicate = self.compile(conditions)
+        return [
+            idx for idx, item in enumerate(self.data)
+            if predicate(item)
+        ]
+
+    def _indexed_positions(self, conditions: dict):
+        """Matching positions found through an index, or None to scan."""
+        postings_lists = []
+        best_range = None
+        for key, value in conditions.items():
             if isinstance(value, dict):
-                # Handle operator queries
-             for op, op_value in value.items():
-                    if item_value is None and op in ["$gt", "$lt", "$gte", "$lte", "$between"]:
-                       return False
-                    try:
-                        if op == "$gt" and not (item_value > op_value):
-                            return False
-                        elif op == "$lt" and not (item_value < op_value):
-                            return False
-                        elif op == "$gte" and not (item_value >= op_value):
-                            return False
-                        elif op == "$lte" and not (item_value <= op_value):
-                            return False
-                        elif op == "$ne" and not (item_value != op_value):
-                            return False
-                        elif op == "$in" and item_value not in op_value:
-                            return False
-                        elif op == "$between":
-                            if not isinstance(op_value, (list, tuple)) or len(op_value) != 2:
-                                return False
-                            if item_value is None or not (op_value[0] <= item_value <= op_value[1]):
-                                return False
-                        elif op == "$like":
-                            if item_value is None:
-                                return False
-                            # SQL LIKE implementation: % for any chars, _ for single char
-                            pattern = str(op_value).replace("%", ".*").replace("_", ".")
-                            if not str(op_value).startswith("%"):
-                                pattern = "^" + pattern
-                            if not str(op_value).endswith("%"):
-                                pattern = pattern + "$"
-                            if not re.search(pattern, str(item_value), re.IGNORECASE):
-                                return False
-                    except (TypeError, ValueError):
-                     return False
-             return True
+                found = self._range_slice(key, value)
+                if found is None:
+                    continue
+                _, start, end = found
+                if start == end:
+                    return []
+                if best_range is None or end - start < best_range[2] - best_range[1]:
+                    best_range = found
+                    range_key = key
+            elif value is not None:
+                try:
+                    postings = self.indexes.get(key, {}).get(value, ())
+                except TypeError:
+                    continue  # Unhashable value, can't be looked up
+                if not postings:
+                    return []
+                postings_lists.append((postings, key))
+
+        if postings_lists:
+            postings_lists.sort(key=lambda item: len(item[0]))
+            smallest = postings_lists[0][0]
+            if best_range is None or len(smallest) <= best_range[2] - best_range[1]:
+                if len(conditions) == 1:
+                    return list(smallest)
+                return self._intersect(conditions, postings_lists)
+
+        if best_range is None:
+            return None
+        positions, start, end = best_range
+        candidates = positions[start:end]
+        candidates.sort()  # Back to dataset order
+        if _RANGE_OPS.issuperset(conditions[range_key]):
+            # The slice holds exactly the records satisfying the range, only
+            # the other conditions need checking
+            conditions = {
+                key: value for key, value in conditions.items()
+                if key != range_key
+            }
+            if not conditions:
+                return candidates
+        return self._check(conditions, candidates)
+
+    def _intersect(self, conditions, postings_lists):
+        """
+        Intersect equality postings (sorted by length), then check the rest.
+
+        postings_lists holds (postings, field) pairs. Only the conditions
+        not answered by an intersected posting list are checked against
+        the candidates. When no other list is small enough to intersect,
+        the smallest (already ascending) list is used as it is.
+        """
+        candidates, key = postings_lists[0]
+        resolved = {key}
+        for postings, key in postings_lists[1:]:
+            if len(postings) > self.INTERSECT_RATIO * len(candidates):
+                break
+            if len(resolved) == 1:
+                candidates = set(candidates)
+            candidates.intersection_update(postings)
+            resolved.add(key)
+            if not candidates:
+                return []
+        if len(resolved) > 1:
+            candidates = sorted(candidates)
+        if len(resolved) == len(conditions):
+            return candidates
+        return self._check(
+            {
+                key: value for key, value in conditions.items()
+                if key not in resolved
+            },
+            candidates,
+        )
+
+    def _check(self, conditions, candidates):
+        predicate = self.compile(conditions)
+        data = self.data
+        return [pos for pos in candidates if predicate(data[pos])]
+
+    def _range_slice(self, key, ops: dict):
+        """
+        Locate the records whose value satisfies the range operators in ops.
+
+        Returns:
+            tuple or None: (positions sorted by value, start, end), or None
+            if ops has no numeric range to look up
+        """
+        bounds = []
+        for op, op_value in ops.items():
+            if op == "$between":
+                op_value = _between_bounds(op_value)
+                if op_value is None:
+                    return None
+                bounds.append(("$gte", op_value[0]))
+                bounds.append(("$lte", op_value[1]))
+            elif op in _BISECT:
+                bounds.append((op, op_value))
+        if not bounds or not all(_is_number(bound) for _, bound in bounds):
+            return None
+
+        values, positions = self._sorted_index(key)
+        start, end = 0, len(values)
+        for op, bound in bounds:
+            search, is_lower = _BISECT[op]
+            at = search(values, bound)
+            if is_lower:
+                start = max(start, at)
             else:
-                # Simple equality
-                return item_value == value
-        
-        return [item for item in self.data if all(matches_condition(item, k, v) for k, v in conditions.items())]
-        
-    
\ No newline at end of file
+                end = min(end, at)
+        return positions, start, max(start, end)
+
+    def _sorted_index(self, key):
+        index = self._sorted.get(key)
+        if index is None:
+            values = [record.get(key) for record in self.data]
+            pairs = sorted(
+                (value, pos) for pos, value in enumerate(values)
+                if _is_number(value)
+            )
+            index = self._sorted[key] = (
+                [value for value, _ in pairs],
+                [pos for _, pos in pairs],
+            )
+        return index
@@ -1,6 +1,19 @@
 """
 QueryBuilder class for method chaining support
 """
+import operator
+
+# filter() keyword suffix -> query operator
+_OPERATORS = {
+    "gt": "$gt",
+    "lt": "$lt",
+    "gte": "$gte",
+    "lte": "$lte",
+    "ne": "$ne",
+    "in": "$in",
+    "between": "$between",
+    "like": "$like"
+}
 
 
 class QueryBuilder:
@@ -24,7 +37,6 @@ class QueryBuilder:
         """
         self.database = database
         self.table_name = table_name
-        self._data = database.data
         self._filter_conditions = []
         self._sort_key = None
         self._sort_reverse = False
@@ -60,26 +72,16 @@ class QueryBuilder:
             for key, value in kwargs.items():
                 if "__" in key:
                     # Handle operator-based queries
-                    field, operator = key.rsplit("__", 1)
-                    op_map = {
-                        "gt": "$gt",
-                        "lt": "$lt",
-                        "gte": "$gte",
-                        "lte": "$lte",
-                        "ne": "$ne",
-                        "in": "$in",
-                        "between": "$between",
-                        "like": "$like"
-                    }
-                    if operator in op_map:
+                    field, op = key.rsplit("__", 1)
+                    if op in _OPERATORS:
                         if field not in query:
                             query[field] = {}
                         if isinstance(query[field], dict):
-                            query[field][op_map[operator]] = value
+                            query[field][_OPERATORS[op]] = value
                         else:
                             # Field already has a simple value, convert to operator dict
                             old_value = query[field]
-                            query[field] = {"$eq": old_value, op_map[operator]: value}
+                            query[field] = {"$eq": old_value, _OPERATORS[op]: value}
                     else:
                         # Not a recognized operator, treat as regular field
                         query[key] = value
@@ -155,28 +157,14 @@ class QueryBuilder:
         Example:
             results = db.table("users").filter(age__gt=18).fetch()
         """
-        # Start with all data
-        results = self._data
-
-        # Apply filters sequentially
-        if self._filter_conditions:
-            # Ensure indexer has data
-            if not hasattr(self.database.indexer, 'data') or self.database.indexer.data is None:
-                self.database.indexer.build(self._data)
-
-            # Apply each filter condition sequentially
-            for filter_query in self._filter_conditions:
-                if filter_query:
-                    # Temporarily update indexer data to current results
-                    self.database.indexer.data = results
-                    results = self.database.indexer.query(filter_query)
+        results = found = self._filtered()
 
         # Apply sorting
         if self._sort_key:
             try:
                 results = sorted(
                     results,
-                    key=lambda x: x.get(self._sort_key),
+                    key=operator.methodcaller("get", self._sort_key),
                     reverse=self._sort_reverse
                 )
             except (TypeError, KeyError):
@@ -191,6 +179,10 @@ class QueryBuilder:
         if self._map_function:
             results = [self._map_function(item) for item in results]
 
+        if results is found:
+            # Possibly the list held by the query cache, or the dataset
+            # itself for an empty filter; callers get their own list
+            results = list(results)
         return results
 
     def count(self):
@@ -204,20 +196,50 @@ class QueryBuilder:
             count = db.table("users").filter(age__gt=18).count()
         """
         # Execute filters but not map
-        results = self._data
+        return len(self._filtered())
 
-        if self._filter_conditions:
-            # Ensure indexer has data
-            if not hasattr(self.database.indexer, 'data') or self.database.indexer.data is None:
-                self.database.indexer.build(self._data)
+    def _merged_filters(self):
+        """
+        Merge the chained filter conditions into a single query.
 
-            for filter_query in self._filter_conditions:
-                if filter_query:
-                    # Temporarily update indexer data to current results
-                    self.database.indexer.data = results
-                    results = self.database.indexer.query(filter_query)
+        Conditions on the same field are combined into one operator dict,
+        a plain value becoming $eq.
 
-        return len(results)
+        Returns:
+            tuple: (query, extra) where extra lists the conditions that
+            clash with the query (same operator, different value) and are
+            checked on their own
+        """
+        query = {}
+        extra = []
+        for conditions in self._filter_conditions:
+            for field, value in conditions.items():
+                if field not in query:
+                    query[field] = value
+                    continue
+                current = query[field]
+                if current == value:
+                    continue
+                ops = dict(current) if isinstance(current, dict) else {"$eq": current}
+                new_ops = value if isinstance(value, dict) else {"$eq": value}
+                if any(op in ops and ops[op] != v for op, v in new_ops.items()):
+                    extra.append({field: value})
+                    continue
+                ops.update(new_ops)
+                query[field] = ops
+        return query, extra
+
+    def _filtered(self):
+        """
+        Run the filters as one query through Database.find(), so repeated
+        chains (e.g. dashboards calling count()) are served by the cache.
+        """
+        query, extra = self._merged_filters()
+        results = self.database.find(query)
+        for conditions in extra:
+            predicate = self.database.indexer.compile(conditions)
+            results = [item for item in results if predicate(item)]
+        return results
 
     def first(self):
         """
@@ -1,57 +1,179 @@
 """
 Query caching layer for jflatdb
-Implements in-memory caching with LRU eviction policy
+Implements in-memory caching with lazy segmented LRU eviction policy
+and a TinyLFU admission filter
 """
 
-import json
-from collections import OrderedDict
+import copy
+import heapq
+
+from .indexer import compile_query
+
+
+def _canonical(value):
+    """
+    Recursively convert a query value into a hashable canonical form.
+
+    Dicts become frozensets of (key, value) pairs so key order doesn't
+    matter, lists/tuples become tuples. Sequences, floats and bools are
+    tagged with their type so {"x": 1}, {"x": 1.0} and {"x": True} stay
+    distinct (they behave differently under $like), as do ["a"] and
+    ("a",) (a list never equals a tuple). Other unhashable values are
+    keyed on their repr.
+    """
+    if isinstance(value, dict):
+        return frozenset((k, _canonical(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_canonical(v) for v in value))
+    if isinstance(value, set):
+        return frozenset(_canonical(v) for v in value)
+    if type(value) is float or type(value) is bool:
+        return (type(value), value)
+    try:
+        hash(value)
+    except TypeError:
+        # Unhashable leaf (e.g. bytearray): key on its repr instead
+        return (type(value), repr(value))
+    return value
+
+
+class _FrequencySketch:
+    """
+    Count-Min Sketch estimating how often cache keys were requested.
+
+    Four rows of small saturating counters, each indexed by its own
+    multiplicative hash of hash(key). Every `sample_size` increments all
+    counters are halved, so popularity from long ago fades out.
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+    # Odd 64-bit multipliers, one per row
+    SEEDS = (
+        0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F,
+        0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+    )
+
+    def __init__(self, max_size):
+        width = 16
+        while width < 10 * max_size:
+            width *= 2
+        # Rows are indexed by the top bits of each 64-bit product
+        self._shift = 64 - width.bit_length() + 1
+        self.rows = [[0] * width for _ in range(self.DEPTH)]
+        self.sample_size = 10 * max(max_size, 1)
+        self.additions = 0
+
+    def _slots(self, key):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        shift = self._shift
+        return [
+            ((h * seed) & 0xFFFFFFFFFFFFFFFF) >> shift for seed in self.SEEDS
+        ]
+
+    def increment(self, key):
+        for row, slot in zip(self.rows, self._slots(key)):
+            if row[slot] < self.MAX_COUNT:
+                row[slot] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.age()
+
+    def frequency(self, key):
+        return min(row[slot] for row, slot in zip(self.rows, self._slots(key)))
+
+    def age(self):
+        """Halve every counter."""
+        self.rows = [[count >> 1 for count in row] for row in self.rows]
+        self.additions //= 2
 
 
 class QueryCache:
     """
-    In-memory cache for query results with LRU eviction policy.
+    In-memory cache for query results with lazy segmented LRU eviction.
+
+    Hits only stamp the entry with an access ordinal instead of reordering
+    a linked structure. New entries start on probation; a hit promotes
+    them to the protected segment. The cache may grow to 2x max_size, at
+    which point the least recently used probation entries are evicted in
+    one batch, trimming it back to max_size. Protected entries beyond
+    PROTECTED_SHARE of max_size are demoted back to probation first.
+
+    Once max_size entries are cached, a new query is only admitted if it
+    has been requested more often than the least recently used entry
+    (TinyLFU), so one-off queries can't push out frequently reused ones.
 
     Attributes:
-        max_size (int): Maximum number of cached queries
+        max_size (int): Number of queries kept after an eviction batch
         enabled (bool): Whether caching is enabled
-        cache (OrderedDict): Ordered dictionary storing cached results
+        admission (bool): Whether the TinyLFU admission filter is applied
+        copy_on_get (bool): Whether hits return a copy of the cached list
+        cache (dict): Cache key -> [result, last access ordinal, protected]
+        signatures (dict): Cache key -> (compiled predicate of the query,
+            fields read by the query)
+        field_index (dict): Field name -> set of cache keys reading it
         hits (int): Number of cache hits
         misses (int): Number of cache misses
+        admission_skipped (int): Results not cached by the admission filter
     """
 
-    def __init__(self, max_size=100, enabled=True):
+    # Share of max_size the protected segment may hold
+    PROTECTED_SHARE = 0.8
+    # Most predicate calls (cached queries x written records) spent on
+    # finding the entries a write affects; beyond it clearing is cheaper
+    MAX_INVALIDATION_CHECKS = 10000
+
+    def __init__(self, max_size=100, enabled=True, admission=True,
+                 copy_on_get=False):
         """
         Initialize the query cache.
 
+        Cached result lists are stored and returned as-is, callers must not
+        mutate them. Pass copy_on_get=True to hand out copies instead.
+
         Args:
             max_size (int): Maximum number of queries to cache (default: 100)
             enabled (bool): Enable/disable caching (default: True)
+            admission (bool): Enable the TinyLFU admission filter (default: True)
+            copy_on_get (bool): Return a copy of the cached list on every hit
+                (default: False)
         """
         self.max_size = max_size
         self.enabled = enabled
-        self.cache = OrderedDict()
+        self.admission = admission
+        self.copy_on_get = copy_on_get
+        self._cms = _FrequencySketch(max_size)
+        self.cache = {}
+        self._tick = 0
+        self.signatures = {}
+        self._plans = {}
+        self.field_index = {}
         self.hits = 0
         self.misses = 0
+        self.admission_skipped = 0
 
-    def _make_key(self, query: dict) -> str:
+    def make_key(self, query: dict):
         """
         Convert a query dictionary into a hashable cache key.
 
+        Callers that probe the cache repeatedly with the same query can
+        compute the key once and pass it to get()/set().
+
         Args:
             query (dict): The query dictionary
 
         Returns:
-            str: JSON string representation of the query
+            frozenset: Canonical, order-independent form of the query
         """
-        # Sort keys to ensure consistent cache keys for same query
-        return json.dumps(query, sort_keys=True)
+        return _canonical(query)
 
-    def get(self, query: dict):
+    def get(self, query: dict, key=None):
         """
         Retrieve cached result for a query.
 
         Args:
             query (dict): The query to look up
+            key: Precomputed make_key(query), computed if omitted
 
         Returns:
             list or None: Cached results if found, None otherwise
@@ -59,47 +181,187 @@ class QueryCache:
         if not self.enabled:
             return None
 
-        key = self._make_key(query)
+        if key is None:
+            key = self.make_key(query)
+        self._cms.increment(key)
+        entry = self.cache.get(key)
 
-        if key in self.cache:
-            # Move to end (most recently used)
-            self.cache.move_to_end(key)
+        if entry is not None:
+            # Stamp as most recently used, no reordering; a second access
+            # promotes the entry out of probation
+            self._tick += 1
+            entry[1] = self._tick
+            entry[2] = True
             self.hits += 1
-            return self.cache[key]
+            return list(entry[0]) if self.copy_on_get else entry[0]
 
         self.misses += 1
         return None
 
-    def set(self, query: dict, result: list):
+    def set(self, query: dict, result: list, key=None):
         """
         Store query result in cache.
 
         Args:
             query (dict): The query that was executed
             result (list): The query result to cache
+            key: Precomputed make_key(query), computed if omitted
         """
         if not self.enabled:
             return
 
-        key = self._make_key(query)
+        if key is None:
+            key = self.make_key(query)
+
+        if key not in self.cache:
+            if (self.admission and len(self.cache) >= self.max_size
+                    and not self._admit(key)):
+                self.admission_skipped += 1
+                return
+            self._remember(key, query)
+
+        # Stored without copying, results are treated as read-only
+        self._tick += 1
+        entry = self.cache.get(key)
+        protected = entry is not None and entry[2]
+        self.cache[key] = [
+            result if result is not None else [], self._tick, protected
+        ]
+
+        # Evict in one batch once the soft limit is reached (lazy LRU)
+        if len(self.cache) >= 2 * self.max_size:
+            self._evict()
+
+    def _admit(self, key):
+        """Admit key only if it is more popular than the next victim."""
+        if not self.cache:
+            return True
+        cache = self.cache
+        probation = [k for k, entry in cache.items() if not entry[2]]
+        victim = min(probation or cache, key=lambda k: cache[k][1])
+        return self._cms.frequency(key) > self._cms.frequency(victim)
+
+    def prune(self, size=None):
+        """
+        Evict down to size entries now instead of at the soft limit.
+
+        Useful before a burst of writes or a memory-sensitive phase, when
+        the cache may be holding up to 2x max_size entries.
+
+        Args:
+            size (int): Entries to keep (default: max_size)
+
+        Returns:
+            int: Number of entries evicted
+        """
+        before = len(self.cache)
+        self._evict(self.max_size if size is None else size)
+        return before - len(self.cache)
+
+    def _evict(self, size=None):
+        """Drop least recently used probation entries until size remain."""
+        cache = self.cache
+        if size is None:
+            size = self.max_size
+        excess = len(cache) - size
+        if excess <= 0:
+            return
+
+        def last_access(k):
+            return cache[k][1]
+
+        protected = [k for k, entry in cache.items() if entry[2]]
+        protected_size = min(int(self.max_size * self.PROTECTED_SHARE), size)
+        overflow = len(protected) - protected_size
+        for key in heapq.nsmallest(overflow, protected, key=last_access):
+            cache[key][2] = False  # Demoted back to probation
+
+        probation = [k for k, entry in cache.items() if not entry[2]]
+        self._drop(heapq.nsmallest(excess, probation, key=last_access))
 
-        # If key exists, move to end
-        if key in self.cache:
-            self.cache.move_to_end(key)
+    def _remember(self, key, query: dict):
+        """Record the signature of a newly cached query."""
+        # Compile a copy so later mutation by the caller can't skew
+        # invalidation; invalidation runs the predicate per changed record
+        fields = frozenset(query)
+        predicate = compile_query(copy.deepcopy(query), self._plans)
+        self.signatures[key] = (predicate, fields)
+        for field in fields:
+            self.field_index.setdefault(field, set()).add(key)
 
-        # Store the result (make a copy to avoid mutation issues)
-        self.cache[key] = result.copy() if result else []
+    def _forget(self, key):
+        """Drop the signature bookkeeping of an evicted/invalidated key."""
+        _, fields = self.signatures.pop(key, (None, ()))
+        for field in fields:
+            keys = self.field_index.get(field)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.field_index[field]
 
-        # Evict oldest entry if cache is full (LRU)
-        if len(self.cache) > self.max_size:
-            self.cache.popitem(last=False)  # Remove first (oldest) item
+    def _drop(self, keys):
+        for key in keys:
+            self.cache.pop(key, None)
+            self._forget(key)
 
     def invalidate(self):
         """
         Clear all cached queries.
-        Called when database is modified (insert/update/delete).
+        Used when the whole dataset is replaced (transactions, migrations).
         """
         self.cache.clear()
+        self.signatures.clear()
+        self.field_index.clear()
+
+    def invalidate_records(self, records):
+        """
+        Drop cached queries whose result set changes when records are
+        inserted or deleted.
+
+        A cached query is only affected if at least one of the records
+        satisfies it, e.g. inserting {"age": 20} keeps {"age": {"$gt": 25}}.
+
+        Large batches checked against a large cache clear it instead, see
+        MAX_INVALIDATION_CHECKS.
+
+        Args:
+            records (list): Records that were inserted or deleted
+        """
+        if not records or not self.cache:
+            return
+        if len(records) * len(self.signatures) > self.MAX_INVALIDATION_CHECKS:
+            self.invalidate()
+            return
+        stale = [
+            key for key, (predicate, _) in self.signatures.items()
+            if any(predicate(record) for record in records)
+        ]
+        self._drop(stale)
+
+    def invalidate_fields(self, fields, records=None):
+        """
+        Drop cached queries that read any of the given fields.
+
+        Queries on other fields keep their entries: their result sets
+        still hold the same (in-place updated) records.
+
+        Args:
+            fields (iterable): Field names modified by an update
+            records (list): Optional before/after images of the updated
+                records; when given, only queries matching one of them
+                are dropped (unless checking them would exceed
+                MAX_INVALIDATION_CHECKS)
+        """
+        candidates = set()
+        for field in fields:
+            candidates.update(self.field_index.get(field, ()))
+        if (records is not None and len(records) * len(candidates)
+                <= self.MAX_INVALIDATION_CHECKS):
+            candidates = [
+                key for key in candidates
+                if any(self.signatures[key][0](record) for record in records)
+            ]
+        self._drop(candidates)
 
     def clear(self):
         """Alias for invalidate()"""
@@ -112,7 +374,7 @@ class QueryCache:
     def disable(self):
         """Disable caching and clear cache"""
         self.enabled = False
-        self.cache.clear()
+        self.invalidate()
 
     def get_stats(self) -> dict:
         """
@@ -132,10 +394,12 @@ class QueryCache:
             "max_size": self.max_size,
             "hits": self.hits,
             "misses": self.misses,
-            "hit_rate": f"{hit_rate:.2f}%"
+            "hit_rate": f"{hit_rate:.2f}%",
+            "admission_skipped": self.admission_skipped
         }
 
     def reset_stats(self):
-        """Reset cache statistics (hits and misses)"""
+        """Reset cache statistics (hits, misses and skipped admissions)"""
         self.hits = 0
         self.misses = 0
+        self.admission_skipped = 0
@@ -2,50 +2,242 @@
 In-Build Function(min,max,etc)
 """
 
+from collections import defaultdict
+
 from .exceptions.errors import QueryError
 
 
+# Types aggregates treat as numeric, one global lookup instead of
+# building the tuple from int and float on every check
+_NUMERIC = (int, float)
+
+# String function name -> (function, error message)
+_STRING_OPS = {
+    "upper": (str.upper, "Cannot apply UPPER on column: {column}"),
+    "lower": (str.lower, "Cannot apply LOWER on column: {column}"),
+    "length": (len, "Cannot compute LENGTH for column: {column}"),
+    "trim": (str.strip, "Cannot apply TRIM on column: {column}"),
+}
+
+
+def _distinct_mixed(values):
+    """
+    Unique values in order of first appearance, for values that include
+    unhashable ones (e.g. lists, dicts).
+    """
+    results = []
+    seen_hashable = set()
+    # Unhashable values: the distinct ones so far, the ids of every
+    # object already compared, and the types known to be unhashable
+    unhashable = []
+    seen_ids = set()
+    unhashable_types = set()
+
+    for value in values:
+        if type(value) not in unhashable_types:
+            # O(1) membership; only unhashable values raise here
+            try:
+                if value not in seen_hashable:
+                    seen_hashable.add(value)
+                    results.append(value)
+                continue
+            except TypeError:
+                if type(value).__hash__ is None:
+                    unhashable_types.add(type(value))
+
+        # Fallback for unhashable values: an object seen before needs no
+        # comparison, others an O(n) equality scan
+        if id(value) in seen_ids:
+            continue
+        seen_ids.add(id(value))
+        if not any(value == existing for existing in unhashable):
+            unhashable.append(value)
+            results.append(value)
+    return results
+
+
 class QueryEngine:
-    def __init__(self, table_data):
+    def __init__(self, table_data, indexer=None):
         self.data = table_data
+        # Optional Indexer over the same data, answers numeric between()
+        # through its sorted range index
+        self.indexer = indexer
+        # column -> (min, max, sum, count) over its numeric values
+        self._agg_cache = {}
+        # column -> number of rows holding a non-None value
+        self._count_cache = {}
+        # Row count the cache was maintained for, catches unnotified edits
+        self._rows = len(table_data)
+
+    # ----------- AGGREGATE CACHE ------------
+    def invalidate_aggregates(self):
+        """Drop all cached aggregates (e.g. after editing self.data directly)."""
+        self._agg_cache.clear()
+        self._count_cache.clear()
+        self._rows = len(self.data)
+
+    def notify_insert(self, record):
+        """Record appended to self.data: fold it into cached aggregates."""
+        self._rows += 1
+        for column, value in record.items():
+            self._add(column, value)
+            self._count(column, value, 1)
+
+    def notify_delete(self, record):
+        """Record removed from self.data: take it out of cached aggregates."""
+        self._rows -= 1
+        for column, value in record.items():
+            self._remove(column, value)
+            self._count(column, value, -1)
+
+    def notify_update(self, old, new):
+        """Record changed in place from old to new."""
+        for column, value in new.items():
+            if column in old:
+                previous = old[column]
+                if type(previous) is type(value) and previous == value:
+                    continue
+                self._remove(column, previous)
+                self._count(column, previous, -1)
+            self._add(column, value)
+            self._count(column, value, 1)
+
+    def _count(self, column, value, delta):
+        count = self._count_cache.get(column)
+        if count is not None and value is not None:
+            self._count_cache[column] = count + delta
+
+    def _add(self, column, value):
+        summary = self._agg_cache.get(column)
+        if summary is None or not isinstance(value, _NUMERIC):
+            return
+        low, high, total, count = summary
+        if not count:
+            self._agg_cache[column] = (value, value, value, 1)
+        else:
+            # Same left-to-right addition a rescan would do, so even float
+            # sums stay identical
+            self._agg_cache[column] = (
+                min(low, value), max(high, value), total + value, count + 1
+            )
+
+    def _remove(self, column, value):
+        summary = self._agg_cache.get(column)
+        if summary is None or not isinstance(value, _NUMERIC):
+            return
+        low, high, total, count = summary
+        if count == 1:
+            self._agg_cache[column] = (None, None, 0, 0)
+        elif (value == low or value == high
+              or isinstance(value, float) or isinstance(total, float)):
+            # Losing an extremum needs a rescan, and subtracting floats
+            # would drift from the rescanned sum
+            del self._agg_cache[column]
+        else:
+            self._agg_cache[column] = (low, high, total - value, count - 1)
+
+    def _summary(self, column):
+        if len(self.data) != self._rows:
+            self.invalidate_aggregates()
 
+        summary = self._agg_cache.get(column)
+        if summary is None:
+            # min, max, sum and count in one pass without a values list.
+            # The comparisons mirror the builtins (the first value seeds
+            # low/high, later ones replace it only on < / >), so NaN and
+            # mixed int/float columns give the same results
+            low = high = None
+            total = count = 0
+            for row in self.data:
+                value = row.get(column)
+                kind = type(value)
+                if kind is int or kind is float or (
+                        value is not None and isinstance(value, _NUMERIC)):
+                    if count:
+                        if value < low:
+                            low = value
+                        if value > high:
+                            high = value
+                    else:
+                        low = high = value
+                    total += value
+                    count += 1
+            summary = (low, high, total, count)
+            self._agg_cache[column] = summary
+        return summary
+
+    # ----------- AGGREGATES ------------
     def min(self, column):
-        values = [row[column] for row in self.data if column in row and isinstance(row[column], (int, float))]
-        if not values:
+        low, _, _, count = self._summary(column)
+        if not count:
             raise QueryError(f"Cannot compute min for column: {column} (empty dataset or no numeric values)")
-        return min(values)
+        return low
 
     def max(self, column):
-        values = [row[column] for row in self.data if column in row and isinstance(row[column], (int, float))]
-        if not values:
+        _, high, _, count = self._summary(column)
+        if not count:
             raise QueryError(f"Cannot compute max for column: {column} (empty dataset or no numeric values)")
-        return max(values)
+        return high
 
     def avg(self, column):
-        values = [row[column] for row in self.data if column in row and isinstance(row[column], (int, float))]
-        if not values:
+        _, _, total, count = self._summary(column)
+        if not count:
             raise QueryError(f"Cannot compute avg for column: {column} (empty dataset or no numeric values)")
-        return sum(values) / len(values)
+        return total / count
 
     def sum(self, column):
-        values = [row[column] for row in self.data if column in row and isinstance(row[column], (int, float))]
-        return sum(values) if values else 0
+        return self._summary(column)[2]
 
     def count(self, column=None):
         if column:
-            return sum(1 for row in self.data if column in row and row[column] is not None)
+            if len(self.data) != self._rows:
+                self.invalidate_aggregates()
+            count = self._count_cache.get(column)
+            if count is None:
+                # A throwaway list counts faster than sum() over a generator
+                count = self._count_cache[column] = len([
+                    None for row in self.data if row.get(column) is not None
+                ])
+            return count
         return len(self.data)
 
     def between(self, column, low, high):
-        return [row for row in self.data if column in row and low <= row[column] <= high]
+        if isinstance(low, _NUMERIC) and isinstance(high, _NUMERIC):
+            # Only numeric values compare with numeric bounds, so a cached
+            # summary can rule the whole column out without a scan
+            summary = self._agg_cache.get(column)
+            if summary is not None and len(self.data) == self._rows:
+                low_value, high_value, _, count = summary
+                if not count or high < low_value or low > high_value:
+                    return []
+
+            indexer = self.indexer
+            if (indexer is not None and indexer.data is self.data
+                    and low == low and high == high):
+                # Numeric bounds only match numeric values: bisect the
+                # sorted index instead of comparing every row
+                return indexer.query({column: {"$between": [low, high]}})
+
+        results = []
+        for row in self.data:
+            value = row.get(column)
+            if value is None:
+                continue
+            try:
+                if low <= value <= high:
+                    results.append(row)
+            except TypeError:
+                continue  # Not comparable with the bounds
+        return results
 
     def group_by(self, column):
-        grouped = {}
+        # defaultdict avoids building a throwaway list per row the way
+        # setdefault(key, []) does; the None group is dropped at the end
+        grouped = defaultdict(list)
         for row in self.data:
-            key = row.get(column)
-            if key is not None:
-                grouped.setdefault(key, []).append(row)
-        return grouped
+            grouped[row.get(column)].append(row)
+        grouped.pop(None, None)
+        return dict(grouped)
 
     def distinct(self, column, *, sort: bool = False, include_none: bool = False):
         """
@@ -67,31 +259,19 @@ class QueryEngine:
             list: A list of unique values from the specified column.
         """
         try:
-            results = []
-            seen_hashable = set()
-
-            for row in self.data:
-                if column not in row:
-                    continue
-                value = row.get(column)
-                if value is None and not include_none:
-                    continue
-
-                # Prefer O(1) membership for hashable values
-                try:
-                    is_hashable = True
-                    _ = hash(value)
-                except TypeError:
-                    is_hashable = False
-
-                if is_hashable:
-                    if value not in seen_hashable:
-                        seen_hashable.add(value)
-                        results.append(value)
-                else:
-                    # Fallback: O(n) membership check for unhashable values (e.g., list, dict)
-                    if not any(value == existing for existing in results):
-                        results.append(value)
+            values = [row[column] for row in self.data if column in row]
+            try:
+                # All hashable (the common case): dedup in C, dicts keep the
+                # order of first appearance
+                unique = dict.fromkeys(values)
+            except TypeError:
+                if not include_none:
+                    values = [value for value in values if value is not None]
+                results = _distinct_mixed(values)
+            else:
+                if not include_none:
+                    unique.pop(None, None)
+                results = list(unique)
 
             if sort:
                 try:
@@ -106,45 +286,15 @@ class QueryEngine:
 
     def upper(self, column):
         """Converts all string values in a column to uppercase."""
-        try:
-            result = []
-            for row in self.data:
-                value = row.get(column)
-                if isinstance(value, str):
-                    result.append(value.upper())
-                else:
-                    result.append(None)
-            return result
-        except Exception:
-            raise QueryError(f"Cannot apply UPPER on column: {column}")
+        return self._str_apply(column, "upper")
 
     def lower(self, column):
         """Converts all string values in a column to lowercase."""
-        try:
-            result = []
-            for row in self.data:
-                value = row.get(column)
-                if isinstance(value, str):
-                    result.append(value.lower())
-                else:
-                    result.append(None)
-            return result
-        except Exception:
-            raise QueryError(f"Cannot apply LOWER on column: {column}")
+        return self._str_apply(column, "lower")
 
     def length(self, column):
         """Returns the length of string values in a column."""
-        try:
-            result = []
-            for row in self.data:
-                value = row.get(column)
-                if isinstance(value, str):
-                    result.append(len(value))
-                else:
-                    result.append(None)
-            return result
-        except Exception:
-            raise QueryError(f"Cannot compute LENGTH for column: {column}")
+        return self._str_apply(column, "length")
 
     def concat(self, *columns):
         """Combines multiple string columns into one."""
@@ -153,26 +303,65 @@ class QueryEngine:
         try:
             result = []
             for row in self.data:
-                concatenated_str = ""
+                # Joined once per row: repeated += copies the growing string
+                # whenever CPython can't resize it in place
+                parts = []
                 for col in columns:
                     value = row.get(col)
                     if isinstance(value, str):
-                        concatenated_str += value
-                result.append(concatenated_str)
+                        parts.append(value)
+                result.append("".join(parts))
             return result
         except Exception:
             raise QueryError(f"Cannot CONCAT columns: {', '.join(columns)}")
 
     def trim(self, column):
         """Removes leading and trailing spaces from string values."""
+        return self._str_apply(column, "trim")
+
+    def str_apply_many(self, column, ops):
+        """
+        Apply several string functions to a column in a single scan.
+
+        Args:
+            column (str): Column name to read.
+            ops (iterable): Names of the functions: "upper", "lower",
+                "length" or "trim".
+
+        Returns:
+            dict: Function name -> list of results, as the method of the
+            same name returns it.
+        """
+        ops = list(dict.fromkeys(ops))
+        unknown = [op for op in ops if op not in _STRING_OPS]
+        if unknown:
+            raise QueryError(f"Unknown string function: {unknown[0]}")
         try:
-            result = []
-            for row in self.data:
-                value = row.get(column)
-                if isinstance(value, str):
-                    result.append(value.strip())
-                else:
-                    result.append(None)
-            return result
+            # Read the column once; each function then only walks the
+            # extracted strings, with None standing in for anything else
+            values = [
+                value if isinstance(value, str) else None
+                for value in [row.get(column) for row in self.data]
+            ]
+            results = {}
+            for op in ops:
+                func = _STRING_OPS[op][0]
+                results[op] = [
+                    func(value) if value is not None else None
+                    for value in values
+                ]
+            return results
+        except Exception:
+            raise QueryError(f"Cannot apply {', '.join(ops).upper()} on column: {column}")
+
+    def _str_apply(self, column, op):
+        """Map a string function over a column, None for non-strings."""
+        func, error = _STRING_OPS[op]
+        try:
+            # The unbound method is looked up once, not per row
+            return [
+                func(value) if isinstance(value, str) else None
+                for value in [row.get(column) for row in self.data]
+            ]
         except Exception:
-            raise QueryError(f"Cannot apply TRIM on column: {column}")
+            raise QueryError(error.format(column=column))
@@ -2,7 +2,29 @@
 Schema constraints and validation
 """
 
+import itertools
+
+# Tells a missing field apart from one holding None
+_MISSING = object()
+
 # Custom Exceptions
+def _add_values(indexes, records):
+    """Add the unique field values of records to their value sets."""
+    indexes = list(indexes.items())
+    if not indexes:
+        return
+    # One pass over the records fills every unique field
+    for existing in records:
+        for field, values in indexes:
+            value = existing.get(field)
+            if value is None:
+                continue
+            try:
+                values.add(value)
+            except TypeError:
+                pass  # Unhashable, found by the scan in _exists()
+
+
 class PrimaryKeyViolation(Exception):
     pass
 
@@ -18,6 +40,12 @@ class Schema:
         self.primary_key = None
         self.unique_fields = set()
         self.not_null_fields = set()
+        self._rules = []           # (name, type, required, default) per field
+        # Unique field -> set of its values in the indexed dataset, so
+        # constraint checks don't scan every record on each insert
+        self._unique_indexes = {}
+        self._indexed = None       # Dataset the indexes were built from
+        self._indexed_rows = 0     # Leading records of it already indexed
 
     def add_field(self, name, field_type, primary_key=False, unique=False, not_null=False, default=None, required=False):
         """
@@ -39,8 +67,15 @@ class Schema:
             "required": required
         }
 
+        # Flattened copy of the rules for validate()
+        self._rules = [
+            (field, rule["type"], rule["required"], rule["default"])
+            for field, rule in self.fields.items()
+        ]
+
         if unique:
             self.unique_fields.add(name)
+            self.invalidate_indexes()
         if not_null:
             self.not_null_fields.add(name)
 
@@ -48,43 +83,121 @@ class Schema:
         """
         Validate a record against schema rules and constraints.
         """
-        # Type, required, and default checks
-        for field, rule in self.fields.items():
-            value = record.get(field)
+        self.validate_record(record)
+        if self.unique_fields:
+            self._sync_indexes(dataset)
+            self._check_unique(record, self._unique_indexes, dataset)
+        return True
+
+    def unique_values(self, dataset: list):
+        """
+        Collect the values of every unique field in dataset, for callers
+        validating against a dataset of their own with validate_incremental().
+
+        Returns:
+            dict: Unique field -> set of its (hashable) values
+        """
+        values = {field: set() for field in self.unique_fields}
+        _add_values(values, dataset)
+        return values
+
+    def validate_incremental(self, record: dict, unique_values: dict, dataset: list):
+        """
+        Validate a record against value sets from unique_values(), adding
+        its values to them once it passes.
 
-            if rule.get("required") and field not in record:
-                raise ValueError(f"Missing required field: {field}")
+        Unlike validate() this leaves the schema's own indexes alone; the
+        caller keeps the sets in step with dataset, which is only scanned
+        for unhashable values.
+        """
+        self.validate_record(record)
+        self._check_unique(record, unique_values, dataset)
+        _add_values(unique_values, (record,))
+        return True
 
-            if field in record and value is not None and not isinstance(value, rule["type"]):
-                raise TypeError(f"{field} must be {rule['type'].__name__}")
+    def validate_record(self, record: dict):
+        """
+        Type, required, default and not-null checks of a single record.
 
-            if "default" in rule and value is None:
-                record[field] = rule["default"]
+        Skips the primary key and unique checks, which need the dataset;
+        enough on its own when the schema has no unique fields.
+        """
+        # One lookup per field, the sentinel tells a missing field from a
+        # None value
+        for field, field_type, required, default in self._rules:
+            value = record.get(field, _MISSING)
+            if value is _MISSING:
+                if required:
+                    raise ValueError(f"Missing required field: {field}")
+                record[field] = default
+            elif value is None:
+                record[field] = default
+            elif not isinstance(value, field_type):
+                raise TypeError(f"{field} must be {field_type.__name__}")
 
         # Not Null check
         for field in self.not_null_fields:
-            if field not in record or record[field] is None:
+            if record.get(field) is None:
                 raise NotNullViolation(f"Field '{field}' cannot be null.")
 
+    def _check_unique(self, record: dict, indexes: dict, dataset: list):
+        """Primary key and unique checks against the given value sets."""
         # Primary Key check
         if self.primary_key:
             pk_value = record.get(self.primary_key)
-            for existing in dataset:
-                if existing.get(self.primary_key) == pk_value:
-                    raise PrimaryKeyViolation(
-                        f"Primary key '{self.primary_key}' with value '{pk_value}' already exists."
-                    )
+            if self._exists(indexes, self.primary_key, pk_value, dataset):
+                raise PrimaryKeyViolation(
+                    f"Primary key '{self.primary_key}' with value '{pk_value}' already exists."
+                )
 
         # Unique check (excluding primary key)
         for field in self.unique_fields:
             if field == self.primary_key:
                 continue
             value = record.get(field)
-            if value is not None:
-                for existing in dataset:
-                    if existing.get(field) == value:
-                        raise UniqueConstraintViolation(
-                            f"Duplicate value '{value}' for unique field '{field}'."
-                        )
+            if value is not None and self._exists(indexes, field, value, dataset):
+                raise UniqueConstraintViolation(
+                    f"Duplicate value '{value}' for unique field '{field}'."
+                )
 
-        return True
+    def rebuild_indexes(self, dataset: list):
+        """
+        Index the unique field values of dataset from scratch.
+
+        validate() calls this itself when it is handed a different list,
+        or one that shrank since the last check.
+        """
+        self._unique_indexes = {field: set() for field in self.unique_fields}
+        self._indexed = dataset
+        self._indexed_rows = 0
+        self._sync_indexes(dataset)
+
+    def invalidate_indexes(self):
+        """
+        Drop the unique value indexes; the next validate() rebuilds them.
+
+        Must be called after records are changed in place (updates,
+        migrations), which validate() can't detect on its own.
+        """
+        self._unique_indexes = {}
+        self._indexed = None
+        self._indexed_rows = 0
+
+    def _sync_indexes(self, dataset: list):
+        """Bring the indexes up to date, indexing only appended records."""
+        if dataset is not self._indexed or len(dataset) < self._indexed_rows:
+            self.rebuild_indexes(dataset)
+            return
+        _add_values(
+            self._unique_indexes,
+            itertools.islice(dataset, self._indexed_rows, None)
+        )
+        self._indexed_rows = len(dataset)
+
+    def _exists(self, indexes, field, value, dataset: list):
+        """Whether any record in dataset holds value in field."""
+        try:
+            return value in indexes[field]
+        except TypeError:
+            # Unhashable values (e.g. lists) can't be indexed, scan instead
+            return any(existing.get(field) == value for existing in dataset)
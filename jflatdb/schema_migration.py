@@ -2,12 +2,30 @@
 Schema migration operations for transforming database records
 """
 
-import uuid
+import copy
 from datetime import datetime
 from typing import List, Dict, Any
 from .utils.logger import Logger
 
 
+def _uuid4():
+    # uuid is only imported by migrations that generate ids
+    import uuid
+    return uuid.uuid4()
+
+
+# Special default keyword -> function producing its value
+_DEFAULT_RESOLVERS = {
+    "NOW()": lambda: datetime.now().isoformat(),
+    "UUID()": lambda: str(_uuid4()),
+    "EMPTY_STRING()": lambda: "",
+    "ZERO()": lambda: 0,
+    "FALSE()": lambda: False,
+    "EMPTY_LIST()": list,
+    "EMPTY_DICT()": dict,
+}
+
+
 class MigrationError(Exception):
     """Raised when a migration operation fails"""
     pass
@@ -22,6 +40,20 @@ class SchemaMigration:
     - remove_field: Remove field from all records
     - rename_field: Rename existing field
     - set_default: Fill missing field values with default
+
+    Default keywords are evaluated once per operation, except UUID() and
+    mutable defaults ([] / {}), which are produced per record.
+
+    Every operation keeps what it needs to be undone (the records a field
+    was added to, shallow copies of the records it changed otherwise), so
+    rollback() restores the records in place without a backup of the
+    whole dataset.
+
+    It also records which fields the operations touched, so the database
+    only has to drop the cached queries reading those fields. Reaching
+    for `data` (or get_data()) directly gives that up: the changes can't
+    be tracked, so the first such access takes a deep copy of the records
+    for rollback() to restore from.
     """
 
     def __init__(self, data: List[Dict[str, Any]]):
@@ -31,8 +63,54 @@ class SchemaMigration:
         Args:
             data: List of records to migrate
         """
-        self.data = data
+        self._data = data
         self.logger = Logger()
+        # Undo log, one entry per operation: ("added", field, records) or
+        # ("restore", [(record, shallow copy before the change), ...])
+        self._undo = []
+        # Fields changed by the operations; None once data was handed out
+        self._fields = set()
+        # Taken when data is first handed out: (list, its records, deep
+        # copies of them, len(self._undo) at that point)
+        self._backup = None
+
+    @property
+    def data(self):
+        """The records being migrated; changes made through it aren't tracked."""
+        self._take_backup()
+        return self._data
+
+    @data.setter
+    def data(self, records):
+        self._take_backup()
+        self._data = records
+
+    def _take_backup(self):
+        """Snapshot the records before they are handed out untracked."""
+        if self._backup is not None:
+            return
+        self._fields = None
+        records = list(self._data)
+        self._backup = (
+            self._data, records, copy.deepcopy(records), len(self._undo)
+        )
+
+    def _touch(self, *field_names):
+        if self._fields is not None:
+            self._fields.update(field_names)
+
+    def changed_fields(self):
+        """
+        Get the fields changed by this migration's operations.
+
+        Operations that matched no record don't count, so an empty set
+        means the records are unchanged.
+
+        Returns:
+            set or None: Field names, or None if the records were accessed
+            through `data`/get_data() and may have changed arbitrarily
+        """
+        return None if self._fields is None else set(self._fields)
 
     def _resolve_default_value(self, default_value):
         """
@@ -54,23 +132,38 @@ class SchemaMigration:
             Resolved value
         """
         if isinstance(default_value, str):
-            if default_value == "NOW()":
-                return datetime.now().isoformat()
-            elif default_value == "UUID()":
-                return str(uuid.uuid4())
-            elif default_value == "EMPTY_STRING()":
-                return ""
-            elif default_value == "ZERO()":
-                return 0
-            elif default_value == "FALSE()":
-                return False
-            elif default_value == "EMPTY_LIST()":
-                return []
-            elif default_value == "EMPTY_DICT()":
-                return {}
+            resolver = _DEFAULT_RESOLVERS.get(default_value)
+            if resolver is not None:
+                return resolver()
 
         return default_value
 
+    def _default_factory(self, default_value):
+        """
+        Resolve a default value once for a whole migration.
+
+        NOW() is evaluated once, so every record of one migration gets the
+        same timestamp. UUID() and mutable defaults (lists, dicts, sets)
+        still need a fresh value per record; everything else is a single
+        object shared by all records.
+
+        Args:
+            default_value: Value or keyword string
+
+        Returns:
+            tuple: (value, factory). factory is None when value is shared
+            by all records, so the per-record loops can store it without a
+            call; otherwise a zero-argument callable producing the value
+            for one record
+        """
+        if isinstance(default_value, str) and default_value == "UUID()":
+            return None, _DEFAULT_RESOLVERS["UUID()"]
+
+        resolved = self._resolve_default_value(default_value)
+        if isinstance(resolved, (list, dict, set)):
+            return None, lambda: copy.deepcopy(resolved)
+        return resolved, None
+
     def add_field(self, field_name: str, default_value=None):
         """
         Add a new field to all records.
@@ -78,10 +171,13 @@ class SchemaMigration:
         Args:
             field_name: Name of the field to add
             default_value: Default value for the new field
-                (supports special keywords)
+                (supports special keywords). Immutable defaults are
+                resolved once and the same object is stored in every record;
+                NOW() gives all records one timestamp, UUID() a fresh id
+                each.
 
         Raises:
-            MigrationError: If field already exists in some records
+            MigrationError: If field name is empty
         """
         if not field_name:
             raise MigrationError("Field name cannot be empty")
@@ -91,18 +187,31 @@ class SchemaMigration:
             f"with default '{default_value}'"
         )
 
-        for record in self.data:
+        value, make_default = self._default_factory(default_value)
+        skipped = 0
+        added = []
+        self._undo.append(("added", field_name, added))
+        for record in self._data:
             if field_name in record:
-                self.logger.warn(
-                    f"Field '{field_name}' already exists in some "
-                    f"records, skipping those"
-                )
+                skipped += 1
                 continue
-            record[field_name] = self._resolve_default_value(default_value)
+            added.append(record)
+            if make_default is None:
+                record[field_name] = value
+            else:
+                record[field_name] = make_default()
+
+        if added:
+            self._touch(field_name)
+        if skipped:
+            self.logger.warn(
+                f"Field '{field_name}' already exists in some "
+                f"records, skipping those"
+            )
 
         self.logger.info(
             f"Migration: Added field '{field_name}' to "
-            f"{len(self.data)} records"
+            f"{len(self._data)} records"
         )
 
     def remove_field(self, field_name: str):
@@ -121,10 +230,14 @@ class SchemaMigration:
         self.logger.info(f"Migration: Removing field '{field_name}'")
 
         removed_count = 0
-        for record in self.data:
+        changed = self._changed_records()
+        for record in self._data:
             if field_name in record:
+                changed.append((record, dict(record)))
                 del record[field_name]
                 removed_count += 1
+        if changed:
+            self._touch(field_name)
 
         self.logger.info(
             f"Migration: Removed field '{field_name}' from "
@@ -153,15 +266,21 @@ class SchemaMigration:
         )
 
         renamed_count = 0
-        for record in self.data:
+        # Filled as records are renamed, so a conflict halfway through can
+        # still be rolled back
+        changed = self._changed_records()
+        for record in self._data:
             if old_name in record:
                 if new_name in record:
                     raise MigrationError(
                         f"Cannot rename '{old_name}' to '{new_name}': "
                         f"'{new_name}' already exists in record"
                     )
+                changed.append((record, dict(record)))
                 record[new_name] = record.pop(old_name)
                 renamed_count += 1
+        if changed:
+            self._touch(old_name, new_name)
 
         self.logger.info(
             f"Migration: Renamed field in {renamed_count} records"
@@ -175,7 +294,8 @@ class SchemaMigration:
 
         Args:
             field_name: Name of the field
-            default_value: Default value to set (supports special keywords)
+            default_value: Default value to set (supports special keywords,
+                resolved as in add_field)
 
         Raises:
             MigrationError: If field name is empty
@@ -188,22 +308,78 @@ class SchemaMigration:
             f"to '{default_value}'"
         )
 
+        value, make_default = self._default_factory(default_value)
         updated_count = 0
-        for record in self.data:
-            if field_name not in record or record[field_name] is None:
-                record[field_name] = self._resolve_default_value(default_value)
+        changed = self._changed_records()
+        for record in self._data:
+            if record.get(field_name) is None:
+                changed.append((record, dict(record)))
+                record[field_name] = (
+                    value if make_default is None else make_default()
+                )
                 updated_count += 1
+        if changed:
+            self._touch(field_name)
 
         self.logger.info(
             f"Migration: Set default for '{field_name}' in "
             f"{updated_count} records"
         )
 
+    def _changed_records(self):
+        """Start the undo entry of an operation, returning its record list."""
+        changed = []
+        self._undo.append(("restore", changed))
+        return changed
+
+    def rollback(self):
+        """
+        Undo the operations applied so far, most recent first.
+
+        Records are restored in place, including their key order. If the
+        records were handed out through `data`/get_data(), the list and
+        its records are first restored from the copy taken at that point,
+        which also undoes the changes made through it.
+        """
+        if self._backup is not None:
+            data, records, copies, undo_size = self._backup
+            self._backup = None
+            for record, previous in zip(records, copies):
+                record.clear()
+                record.update(previous)
+            data[:] = records
+            self._data = data
+            # The copy already undid every later operation
+            del self._undo[undo_size:]
+        while self._undo:
+            entry = self._undo.pop()
+            if entry[0] == "added":
+                _, field_name, added = entry
+                for record in added:
+                    record.pop(field_name, None)
+            else:
+                for record, previous in reversed(entry[1]):
+                    record.clear()
+                    record.update(previous)
+        self.logger.info("Migration: Rolled back")
+
     def get_data(self):
         """
         Get migrated data.
 
+        Like `data`, this hands the records out untracked, see rollback().
+
         Returns:
             List of migrated records
         """
         return self.data
+
+    def result(self):
+        """
+        Get the migrated records once the migration is over, without the
+        rollback copy get_data() takes.
+
+        Returns:
+            List of migrated records
+        """
+        return self._data
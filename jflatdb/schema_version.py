@@ -16,8 +16,16 @@ class SchemaVersion:
     - Current schema version
     - Migration history
     - Timestamps for each migration
+
+    New migrations are appended to schema_version.log, one JSON line
+    each, instead of rewriting the whole history every time. The log is
+    replayed on load and folded into the JSON file once it holds
+    LOG_COMPACT_ENTRIES migrations.
     """
 
+    # Logged migrations kept before they are folded into the JSON file
+    LOG_COMPACT_ENTRIES = 100
+
     def __init__(self, storage_folder='data', db_name='schema_version'):
         """
         Initialize schema version tracker.
@@ -29,9 +37,12 @@ class SchemaVersion:
         self.logger = Logger()
         self.storage_folder = storage_folder
         self.metadata_file = os.path.join(storage_folder, f'{db_name}.json')
+        self.log_file = os.path.join(storage_folder, f'{db_name}.log')
         os.makedirs(storage_folder, exist_ok=True)
 
+        self._logged = 0  # Migrations in the log, not yet in the JSON file
         self._metadata = self._load_metadata()
+        self._replay_log()
 
     def _load_metadata(self):
         """Load metadata from file or initialize if not exists"""
@@ -50,6 +61,44 @@ class SchemaVersion:
             self._save_metadata_internal(metadata)
             return metadata
 
+    def _replay_log(self):
+        """Apply the migrations appended to the log since the last compaction."""
+        if not os.path.exists(self.log_file):
+            return
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            lines = f.read().split('\n')
+
+        # A complete log ends with a newline, anything after it is torn
+        torn = lines.pop() != ''
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                torn = True
+                break
+            if record['from_version'] != self._metadata['version']:
+                continue  # Already folded into the JSON file
+            self._apply_migration(record)
+            self._logged += 1
+
+        if torn:
+            # Rewrite cleanly so later appends don't extend a broken line
+            self.logger.warn("Schema version log was cut short, compacting")
+            self._compact()
+
+    def _apply_migration(self, record):
+        """Record one migration in the in-memory metadata."""
+        self._metadata['version'] = record['to_version']
+        self._metadata['updated_at'] = record['timestamp']
+        self._metadata['migrations'].append(record)
+
+    def _compact(self):
+        """Fold the log into the JSON file and remove it."""
+        self._save_metadata()
+        if os.path.exists(self.log_file):
+            os.unlink(self.log_file)
+        self._logged = 0
+
     def _init_metadata(self):
         """Initialize default metadata structure"""
         return {
@@ -62,8 +111,11 @@ class SchemaVersion:
     def _save_metadata_internal(self, metadata):
         """Internal method to save metadata to file"""
         try:
+            # Serialized in one go: json.dump() would issue a write() per
+            # token through the text layer
+            content = json.dumps(metadata, indent=2, ensure_ascii=False)
             with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
+                f.write(content)
         except Exception as e:
             self.logger.error(f"Failed to save schema metadata: {e}")
             raise
@@ -100,11 +152,15 @@ class SchemaVersion:
             'timestamp': datetime.now().isoformat()
         }
 
-        self._metadata['version'] = new_version
-        self._metadata['updated_at'] = datetime.now().isoformat()
-        self._metadata['migrations'].append(migration_record)
+        self._apply_migration(migration_record)
 
-        self._save_metadata()
+        if self._logged + 1 >= self.LOG_COMPACT_ENTRIES:
+            self._compact()
+        else:
+            # O(1) append instead of rewriting the whole history
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(migration_record, ensure_ascii=False) + '\n')
+            self._logged += 1
         self.logger.info(
             f"Schema version updated: {old_version} -> {new_version}"
         )
@@ -135,5 +191,5 @@ class SchemaVersion:
         schema resets.
         """
         self._metadata = self._init_metadata()
-        self._save_metadata()
+        self._compact()
         self.logger.warn("Schema version reset to 0")
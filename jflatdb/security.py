@@ -3,19 +3,136 @@ Basic encryption / hashing
 """
 
 import time, os, hashlib
+import json
+
+
+# Compact encoder shared by every save. Skipping the circular reference
+# check saves an id() bookkeeping step per container; a cycle then ends
+# in RecursionError instead of ValueError
+_ENCODER = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+
+
+def _json_round_trips(data):
+    """
+    Check that JSON gives data back unchanged.
+
+    The encoder silently turns non-str dict keys ({1: "a"}) into strings
+    and tuples into lists; everything else it can't represent raises.
+    """
+    if type(data) is tuple:
+        return False
+    stack = [data]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        obj = pop()
+        if type(obj) is dict:
+            for key in obj:
+                if type(key) is not str:
+                    return False
+            obj = obj.values()
+        for value in obj:
+            kind = type(value)
+            if kind is dict or kind is list:
+                push(value)
+            elif kind is tuple:
+                return False
+    return True
+
+
+def _dumps(data):
+    """
+    Serialize data as compact JSON.
+
+    Values JSON can't represent (sets, bytes, ...) or would change
+    (non-str keys, tuples) fall back to the legacy repr format, so
+    everything that could be stored before is and reads back the same.
+    """
+    try:
+        encoded = _ENCODER.encode(data)
+    except (TypeError, ValueError, RecursionError):
+        return str(data)
+    # Checked after encoding, which fails on reference cycles
+    if not _json_round_trips(data):
+        return str(data)
+    return encoded
+
+
+def _loads(raw):
+    """Parse JSON, or the legacy repr format of files written before."""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return eval(raw)  # Safe only in controlled usage
+
+
+class _XorTable(dict):
+    """
+    str.translate() table XOR-ing code points with the key.
+
+    Filled lazily, one entry per distinct character seen, so the per
+    character work runs in C instead of a chr/ord generator. XOR is its
+    own inverse, the same table encrypts and decrypts.
+    """
+
+    def __init__(self, key):
+        super().__init__()
+        self.key = key
+
+    def __missing__(self, code):
+        value = self[code] = code ^ self.key
+        return value
+
 
 class Security:
     def __init__(self, password):
+        # Key derived once per Security instance, reused by every save
         self.key = sum(ord(c) for c in password)
+        self._table = _XorTable(self.key)
+        # Low byte of the key as a bytes.translate() table
+        self._low_table = bytes(i ^ (self.key & 0xFF) for i in range(256))
 
     def encrypt(self, data: list):
-        raw = str(data)
-        return ''.join(chr(ord(c) ^ self.key) for c in raw)
+        return self._xor(_dumps(data))
+
+    def encrypt_record(self, record):
+        """Encrypt a single value (e.g. one journal entry) on its own"""
+        return self._xor(_dumps(record))
 
     def decrypt(self, enc: str):
         if not enc: return []
-        raw = ''.join(chr(ord(c) ^ self.key) for c in enc)
-        return eval(raw)  # Safe only in controlled usage
+        return _loads(self._xor(enc))
+
+    def _xor(self, text):
+        """
+        XOR every code point of text with the key.
+
+        When all code points share their high byte (plain JSON going in,
+        ciphertext coming out and back) only the low bytes change, which
+        bytes.translate() does over the UTF-16 encoding several times
+        faster than a str.translate() lookup per character.
+        """
+        try:
+            data = text.encode("utf-16-le")
+        except UnicodeEncodeError:
+            data = b""  # Lone surrogates, possible in ciphertext
+        if data:
+            high = data[1]
+            out_high = high ^ (self.key >> 8)
+            size = len(data) // 2
+            if (out_high <= 0xFF and not 0xD8 <= out_high <= 0xDF
+                    and data[1::2].count(high) == size):
+                # Keep as few full-size buffers alive at once as possible,
+                # snapshots can be large: drop each one once it's consumed
+                low = data[0::2]
+                del data
+                low = low.translate(self._low_table)
+                out = bytearray(2 * size)
+                out[0::2] = low
+                del low
+                out[1::2] = bytes((out_high,)) * size
+                return out.decode("utf-16-le")
+        return text.translate(self._table)
     
     def _generate_id(self) -> str:
         """Generate unique document ID"""
@@ -4,7 +4,7 @@ Transaction support for atomic database operations
 
 import copy
 from typing import Dict, List, Any
-from .utils.logger import Logger
+from .indexer import Indexer
 
 
 class TransactionError(Exception):
@@ -21,24 +21,67 @@ class Transaction:
     - Consistency: Database remains in valid state
     - Isolation: Changes invisible until commit
     - Context manager: with db.transaction() as txn:
+
+    Starting a transaction copies the list of records, not the records:
+    an update copies a record the first time it touches it, so the
+    database's records never change before commit. Nested values are
+    shared between the copies, and records changed in place outside the
+    transaction while it is open are seen by it; pass deep=True to
+    work on a full deep copy instead.
     """
 
-    def __init__(self, database):
+    # One is created per `with db.transaction()` block
+    __slots__ = (
+        'db', 'logger', '_active', '_committed', '_rolled_back', '_base',
+        '_copies', '_inserted', '_index', '_unique_values', '_deleted',
+        '_data_snapshot', '_owned', '_operations', '_generation',
+    )
+
+    def __init__(self, database, deep=False):
         """
         Initialize a new transaction.
 
         Args:
             database: The Database instance this transaction belongs to
+            deep: Deep-copy every record up front instead, fully isolating
+                the transaction from changes made outside it (slow for
+                large datasets)
         """
         self.db = database
-        self.logger = Logger()
+        # Share the database's logger instead of creating one (and
+        # checking the log folder) per transaction
+        self.logger = database.logger
         self._active = False
         self._committed = False
         self._rolled_back = False
 
-        # Create a deep copy of data to work with
-        self._data_snapshot = copy.deepcopy(database.data)
+        # List the transaction started from; commit() applies only the
+        # differences to it while the database still holds it
+        self._base = None
+        # id() of an original record -> the copy update() made of it
+        self._copies = {}
+        self._inserted = []
+        # Index over the working copy, created on the second lookup (the
+        # first one can still go through the database's indexer)
+        self._index = None
+        # Unique field -> values in the working copy, for insert() checks
+        self._unique_values = None
+        # Positions of working copy records deleted since the last _compact()
+        self._deleted = set()
+        if deep:
+            self._data_snapshot = copy.deepcopy(database.data)
+            self._owned = {id(record) for record in self._data_snapshot}
+        else:
+            self._base = database.data
+            # Work on a copy of the list only; records are shared with the
+            # database until the transaction updates them (copy-on-write)
+            self._data_snapshot = list(database.data)
+            # id() of the records this transaction may modify in place:
+            # its own inserts and the copies it made of updated records
+            self._owned = set()
         self._operations: List[Dict[str, Any]] = []
+        # Database write generation the working copy was taken at
+        self._generation = database._generation
 
     def __enter__(self):
         """Enter transaction context"""
@@ -51,6 +94,7 @@ class Transaction:
         Exit transaction context.
 
         Auto-commits if no exception occurred, otherwise rolls back.
+        Exceptions raised in the block are never suppressed.
         """
         if exc_type is not None:
             # Exception occurred, rollback
@@ -61,7 +105,7 @@ class Transaction:
             # No exception, commit the transaction
             self.commit()
 
-        return True
+        return False
 
     def insert(self, record: Dict[str, Any]):
         """
@@ -82,11 +126,26 @@ class Transaction:
         if not self._active:
             raise TransactionError("Cannot insert: transaction not active")
 
-        # Validate using database schema
-        self.db.schema.validate(record, self._data_snapshot)
+        # Validate using database schema, against value sets of the
+        # working copy kept up to date as records are inserted
+        schema = self.db.schema
+        if not schema.unique_fields:
+            # Nothing to check against other records
+            schema.validate_record(record)
+        else:
+            if self._unique_values is None:
+                self._compact()
+                self._unique_values = schema.unique_values(self._data_snapshot)
+            schema.validate_incremental(
+                record, self._unique_values, self._data_snapshot
+            )
 
         # Add to working copy
         self._data_snapshot.append(record)
+        self._owned.add(id(record))
+        self._inserted.append(record)
+        if self._index is not None:
+            self._index.add(record, len(self._data_snapshot) - 1)
 
         # Track operation for logging
         self._operations.append({
@@ -94,7 +153,7 @@ class Transaction:
             'record': record
         })
 
-        self.logger.info(f"Transaction: queued insert {record}")
+        self.logger.info("Transaction: queued insert %s", record)
 
     def update(self, query: Dict[str, Any], updates: Dict[str, Any]):
         """
@@ -116,18 +175,28 @@ class Transaction:
         if self._rolled_back:
             raise TransactionError("Cannot update: transaction rolled back")
 
-        # Find matching records in working copy using simple matching
-        found = [
-            item for item in self._data_snapshot
-            if all(item.get(k) == v for k, v in query.items())
-        ]
+        found = self._positions(query)
 
         if not found:
-            self.logger.warn(f"Transaction: no records found for update query {query}")
-
-        # Apply updates to working copy
-        for item in found:
+            self.logger.warn("Transaction: no records found for update query %s", query)
+
+        # Apply updates to working copy, copying records still shared
+        # with the database first
+        rows = self._data_snapshot
+        for pos in found:
+            item = rows[pos]
+            if id(item) not in self._owned:
+                original = item
+                item = rows[pos] = dict(item)
+                self._owned.add(id(item))
+                self._copies[id(original)] = item
+            if self._index is not None:
+                self._index.notify_update(
+                    pos, {k: item[k] for k in updates if k in item}, updates
+                )
             item.update(updates)
+        if found and not self.db.schema.unique_fields.isdisjoint(updates):
+            self._unique_values = None
 
         # Track operation
         self._operations.append({
@@ -137,7 +206,7 @@ class Transaction:
             'affected': len(found)
         })
 
-        self.logger.info(f"Transaction: queued update for {len(found)} records")
+        self.logger.info("Transaction: queued update for %d records", len(found))
 
     def delete(self, query: Dict[str, Any]):
         """
@@ -158,16 +227,15 @@ class Transaction:
         if self._rolled_back:
             raise TransactionError("Cannot delete: transaction rolled back")
 
-        # Count records before deletion
-        before_count = len(self._data_snapshot)
+        # Only mark the records deleted; the working copy keeps its
+        # positions (and the index stays valid) until _compact()
+        found = self._positions(query)
+        if found:
+            self._deleted.update(found)
+            if self.db.schema.unique_fields:
+                self._unique_values = None
 
-        # Delete from working copy
-        self._data_snapshot = [
-            d for d in self._data_snapshot
-            if not all(d.get(k) == v for k, v in query.items())
-        ]
-
-        affected = before_count - len(self._data_snapshot)
+        affected = len(found)
 
         # Track operation
         self._operations.append({
@@ -176,7 +244,60 @@ class Transaction:
             'affected': affected
         })
 
-        self.logger.info(f"Transaction: queued delete for {affected} records")
+        self.logger.info("Transaction: queued delete for %d records", affected)
+
+    def _positions(self, query: Dict[str, Any]) -> List[int]:
+        """
+        Find the positions of the working copy's records matching query.
+
+        Plain value conditions are looked up in an index and the candidates
+        checked; queries holding None or dict values (which the indexer
+        would read as operators) scan the working copy.
+        """
+        rows = self._data_snapshot
+        deleted = self._deleted
+
+        if any(isinstance(v, dict) for v in query.values()):
+            # Dict values are compared as values here, never as operators
+            def matches(item):
+                return all(item.get(k) == v for k, v in query.items())
+        else:
+            # Same equality tests, generated once per query shape
+            matches = self.db.indexer.compile(query)
+
+        if not query or any(v is None or isinstance(v, dict) for v in query.values()):
+            return [
+                pos for pos, item in enumerate(rows)
+                if pos not in deleted and matches(item)
+            ]
+
+        index = self._index
+        if index is None:
+            if (not self._operations
+                    and self._generation == self.db._generation):
+                # Nothing changed yet, here or in the database: its index
+                # still describes the working copy
+                index = self.db.indexer
+            else:
+                index = self._index = Indexer()
+                index.build(rows)
+        return [
+            pos for pos in index.positions(query)
+            if pos not in deleted and matches(rows[pos])
+        ]
+
+    def _compact(self):
+        """Drop the records marked deleted from the working copy."""
+        deleted = self._deleted
+        if not deleted:
+            return
+        self._data_snapshot[:] = [
+            row for pos, row in enumerate(self._data_snapshot)
+            if pos not in deleted
+        ]
+        if self._index is not None:
+            self._index.remove(sorted(deleted))
+        deleted.clear()
 
     def commit(self):
         """
@@ -195,23 +316,68 @@ class Transaction:
             raise TransactionError("Cannot commit: transaction not active")
 
         try:
-            # Apply changes atomically
-            self.db.data = self._data_snapshot
-            self.db.indexer.build(self.db.data)
-            self.db.cache.invalidate()
-            self.db.save()
+            with self.db._commit_lock:
+                self._compact()
+                changes = self._changes()
+                if changes is not None:
+                    # Re-index, invalidate and journal only what changed
+                    self.db._apply_batch(*changes)
+                else:
+                    # Replace the dataset (rebinds the indexer and query
+                    # engine)
+                    self.db.data = self._data_snapshot
+                    self.db.cache.invalidate()
+                    self.db.save()
+            # Outside the lock: commits finishing together share one fsync
+            self.db.storage.sync_journal()
 
             self._committed = True
             self._active = False
 
             self.logger.info(
-                f"Transaction committed successfully: {len(self._operations)} operations"
+                "Transaction committed successfully: %d operations",
+                len(self._operations)
             )
 
         except Exception as e:
             self.logger.error(f"Transaction commit failed: {e}")
             raise TransactionError(f"Failed to commit transaction: {e}") from e
 
+    def _changes(self):
+        """
+        Work out what commit() has to apply to the database's records.
+
+        Records the transaction never copied are compared by identity, so
+        this is one pass over the dataset without looking into records.
+
+        Returns:
+            tuple or None: (updates, positions, records) for
+            Database._apply_batch(), or None when the dataset should be
+            replaced as a whole: after a deep snapshot, when the database
+            was written to since the transaction started (positions and
+            identities no longer line up with the working copy), or when
+            so much changed that rebuilding is cheaper
+        """
+        base = self._base
+        if base is None or self._generation != self.db._generation:
+            return None
+        rows = self._data_snapshot
+        alive = set(map(id, rows))
+        missing = [pos for pos, record in enumerate(base) if id(record) not in alive]
+        records = [record for record in self._inserted if id(record) in alive]
+        if len(missing) + len(records) > len(base) // 4:
+            return None
+
+        updates = []
+        positions = []
+        for pos in missing:
+            copied = self._copies.get(id(base[pos]))
+            if copied is not None and id(copied) in alive:
+                updates.append((pos, copied))
+            else:
+                positions.append(pos)
+        return updates, positions, records
+
     def rollback(self):
         """
         Rollback the transaction, discarding all changes.
@@ -225,6 +391,12 @@ class Transaction:
 
         # Discard working copy
         self._data_snapshot = []
+        self._owned = set()
+        self._copies = {}
+        self._inserted = []
+        self._index = None
+        self._unique_values = None
+        self._deleted = set()
         self._operations = []
         self._rolled_back = True
         self._active = False
@@ -5,18 +5,30 @@ Logging system
 import time,os
 
 class Logger:
-    def __init__(self, logfile='db.log'):
+    # Messages below the logger's level are dropped before being formatted
+    LEVELS = {'info': 20, 'warn': 30, 'error': 40}
+
+    def __init__(self, logfile='db.log', level='info'):
         self.folder = 'logs'
         self.logfile = os.path.join(self.folder, logfile)
+        self.level = level  # e.g. 'warn' to skip per-operation info messages
         os.makedirs(self.folder, exist_ok=True)  # Ensure 'logs/' exists
 
-    def log(self, level, message):
+    def is_enabled_for(self, level):
+        return self.LEVELS[level] >= self.LEVELS[self.level]
+
+    def log(self, level, message, *args):
+        """Write a message; any args are %-formatted into it only if it is logged."""
+        if not self.is_enabled_for(level):
+            return
+        if args:
+            message = message % args
         timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
         formatted = f"[{timestamp}] [{level.upper()}] {message}"
         print(formatted)
         with open(self.logfile, 'a') as f:
             f.write(formatted + "\n")
 
-    def info(self, message): self.log('info', message)
-    def warn(self, message): self.log('warn', message)
-    def error(self, message): self.log('error', message)
+    def info(self, message, *args): self.log('info', message, *args)
+    def warn(self, message, *args): self.log('warn', message, *args)
+    def error(self, message, *args): self.log('error', message, *args)
@@ -0,0 +1,159 @@
+import os
+
+import pytest
+
+import jflatdb.storage as storage_module
+from jflatdb.database import Database
+
+
+def _patch_storage_init_to_tmp(tmp_path, monkeypatch):
+    """Patch Storage to use temp directory for testing"""
+    def _init(self, filename):
+        self.folder = str(tmp_path)
+        self.filepath = os.path.join(self.folder, filename)
+        self.wal_path = os.path.join(self.folder, f"{filename}.wal")
+        os.makedirs(self.folder, exist_ok=True)
+        return None
+
+    monkeypatch.setattr(storage_module.Storage, "__init__", _init)
+
+
+class TestBulk:
+    """Test deferred persistence with db.bulk()"""
+
+    def test_bulk_writes_once(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        writes = []
+        original_write = db.storage.write
+        db.storage.write = lambda content: (writes.append(1), original_write(content))
+
+        with db.bulk():
+            for i in range(10):
+                db.insert({"id": i, "value": i * 10})
+            assert writes == []
+
+        assert len(writes) == 1
+
+        # Persisted state matches memory
+        db2 = Database('test.json', password='test')
+        assert len(db2.data) == 10
+
+    def test_bulk_keeps_index_current(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+
+        with db.bulk():
+            db.insert({"id": 1, "name": "Alice"})
+            db.insert({"id": 2, "name": "Bob"})
+            assert db.find({"name": "Bob"}) == [{"id": 2, "name": "Bob"}]
+
+        assert db.indexer.indexes["name"]["Bob"] == [1]
+
+    def test_bulk_flushes_on_error(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+
+        with pytest.raises(RuntimeError):
+            with db.bulk():
+                db.insert({"id": 1, "name": "Alice"})
+                raise RuntimeError("Simulated failure")
+
+        db2 = Database('test.json', password='test')
+        assert db2.data == [{"id": 1, "name": "Alice"}]
+
+    def test_nested_bulk_flushes_on_outer_exit(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+
+        with db.bulk():
+            with db.bulk():
+                db.insert({"id": 1})
+            assert not os.path.exists(db.storage.filepath)
+
+        assert os.path.exists(db.storage.filepath)
+
+
+class TestInsertMany:
+    """Test batched inserts with db.insert_many()"""
+
+    def test_insert_many_persists_once(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.find({"name": "Bob"})
+
+        records = [{"id": i, "name": "Bob" if i == 3 else "Alice"} for i in range(5)]
+        assert db.insert_many(records) == 5
+
+        assert len(db.storage.read_journal()) == 1
+        assert db.find({"name": "Bob"}) == [{"id": 3, "name": "Bob"}]
+        assert db.indexer.indexes["name"]["Alice"] == [0, 1, 2, 4]
+
+        db2 = Database('test.json', password='test')
+        assert db2.data == records
+
+    def test_insert_many_is_all_or_nothing(self, tmp_path, monkeypatch):
+        from jflatdb.schema import PrimaryKeyViolation
+
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.schema.add_field("id", int, primary_key=True)
+        db.insert({"id": 1})
+
+        with pytest.raises(PrimaryKeyViolation):
+            db.insert_many([{"id": 2}, {"id": 3}, {"id": 2}])
+
+        assert db.data == [{"id": 1}]
+        assert db.find({"id": 2}) == []
+
+    def test_unique_checks_follow_updates_and_deletes(self, tmp_path, monkeypatch):
+        from jflatdb.schema import PrimaryKeyViolation, UniqueConstraintViolation
+
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.schema.add_field("id", int, primary_key=True)
+        db.schema.add_field("email", str, unique=True)
+        db.schema.add_field("tags", list, unique=True)
+        db.insert_many([{"id": i, "email": f"u{i}@x"} for i in range(5)])
+
+        with pytest.raises(UniqueConstraintViolation):
+            db.insert({"id": 9, "email": "u3@x"})
+        db.update({"id": 3}, {"email": "new@x"})
+        db.insert({"id": 9, "email": "u3@x"})
+
+        with pytest.raises(PrimaryKeyViolation):
+            db.insert({"id": 2})
+        db.delete({"id": 2})
+        db.insert({"id": 2, "tags": ["a"]})
+        with pytest.raises(UniqueConstraintViolation):
+            db.insert({"id": 10, "tags": ["a"]})
+
+    def test_update_of_other_fields_keeps_unique_sets(self, tmp_path, monkeypatch):
+        from jflatdb.schema import UniqueConstraintViolation
+
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.schema.add_field("email", str, unique=True)
+        db.insert_many([{"id": i, "email": f"u{i}@x"} for i in range(5)])
+        db.insert({"id": 5, "email": "u5@x"})
+        indexes = db.schema._unique_indexes
+
+        db.update({"id": 3}, {"name": "Carol"})
+        assert db.schema._unique_indexes is indexes
+        db.insert({"id": 6, "email": "u6@x"})
+        assert db.schema._unique_indexes is indexes
+        with pytest.raises(UniqueConstraintViolation):
+            db.insert({"id": 7, "email": "u6@x"})
+
+        db.update({"id": 3}, {"email": "new@x"})
+        assert db.schema._unique_indexes is not indexes
+        db.insert({"id": 7, "email": "u3@x"})
+        db.close()
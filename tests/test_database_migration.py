@@ -180,6 +180,48 @@ class TestDatabaseMigration:
         result2 = db.find({"name": "Alice"})
         assert result2[0]["status"] == "active"
 
+    def test_migration_keeps_cache_for_untouched_fields(self, tmp_path, monkeypatch):
+        """Test migration only drops cached queries on the fields it changed"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many([{"id": 1, "name": "Alice"}, {"id": 2, "status": None}])
+        db.find({"name": "Alice"})
+        db.find({"status": "active"})
+
+        db.migrate_schema(lambda m: m.set_default("status", "active"))
+
+        assert db.find({"status": "active"}) == [
+            {"id": 1, "name": "Alice", "status": "active"},
+            {"id": 2, "status": "active"},
+        ]
+        assert db.find({"name": "Alice"})[0]["status"] == "active"
+        assert db.cache.hits == 1
+
+        # Direct edits can't be tracked, everything is dropped
+        db.migrate_schema(lambda m: m.data[0].update(name="Bob"))
+        assert db.find({"name": "Alice"}) == []
+        db.close()
+
+    def test_migration_keeps_query_engine(self, tmp_path, monkeypatch):
+        """Test an in-place migration refreshes aggregates without a new engine"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many([{"id": 1, "score": 10}, {"id": 2, "score": 20}])
+        engine = db.query_engine
+        assert db.max("score") == 20
+
+        def double_scores(m):
+            for record in m.data:
+                record["score"] *= 2
+
+        db.migrate_schema(double_scores, "Double scores")
+
+        assert db.query_engine is engine
+        assert db.max("score") == 40
+        assert db.find({"score": 40}) == [{"id": 2, "score": 40}]
+
     def test_migration_with_special_keywords(self, tmp_path, monkeypatch):
         """Test migration with special default value keywords"""
         _patch_storage_init_to_tmp(tmp_path, monkeypatch)
@@ -355,6 +397,63 @@ class TestMigrationRollback:
         assert "status" not in db2.data[0]
         assert db2.data[0]["name"] == "Alice"
 
+    def test_migration_writes_file_only_when_records_change(self, tmp_path, monkeypatch):
+        """Test no-op and rolled back migrations don't rewrite the file"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many([{"id": 1, "status": "active"}, {"id": 2, "status": "new"}])
+        writes = []
+        write = db.storage.write
+        monkeypatch.setattr(db.storage, "write", lambda data: writes.append(1) or write(data))
+
+        db.migrate_schema(lambda m: m.set_default("status", "active"), "No-op")
+        assert writes == []
+        assert db.get_schema_version() == 1
+
+        def failing_migration(m):
+            m.rename_field("status", "state")
+            raise ValueError("Migration failed")
+
+        try:
+            db.migrate_schema(failing_migration, "Failing migration")
+        except ValueError:
+            pass
+        assert writes == []
+
+        def two_operations(m):
+            m.add_field("tags", "EMPTY_LIST()")
+            m.rename_field("status", "state")
+
+        db.migrate_schema(two_operations, "Two operations")
+        assert writes == [1]
+        db.close()
+        assert Database('test.json', password='test').data == db.data
+
+    def test_rollback_restores_direct_changes(self, tmp_path, monkeypatch):
+        """Test a callback editing migration.data and raising is rolled back"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many([{"id": 1, "v": 1}, {"id": 2, "v": 2}])
+        db.close()
+        db = Database('test.json', password='test')
+
+        def failing_migration(m):
+            for record in m.data:
+                record["v"] = 100
+            raise ValueError("Migration failed")
+
+        try:
+            db.migrate_schema(failing_migration, "Failing migration")
+        except ValueError:
+            pass
+
+        assert db.data == [{"id": 1, "v": 1}, {"id": 2, "v": 2}]
+        assert db.find({"v": 100}) == []
+        db.close()
+        assert Database('test.json', password='test').data == db.data
+
     def test_successful_migration_after_rollback(self, tmp_path, monkeypatch):
         """Test successful migration can be performed after a failed one"""
         _patch_storage_init_to_tmp(tmp_path, monkeypatch)
@@ -49,3 +49,12 @@ def test_distinct_mixed_data_types_and_none_handling():
     result_sorted = engine.distinct("v", include_none=True, sort=True)
     expected = [1, "1", [1, 2], {"a": 1}, None]
     assert sorted(map(repr, result_sorted)) == sorted(map(repr, expected))
+
+
+def test_distinct_unhashable_values_and_shared_objects():
+    shared = [1]
+    data = [
+        {"v": shared}, {"v": (1, [2])}, {"v": shared}, {"v": [1]},
+        {"v": (1, [2])}, {"v": (1, 2)}, {"v": (1, 2)},
+    ]
+    assert QueryEngine(data).distinct("v") == [[1], (1, [2]), (1, 2)]
@@ -9,24 +9,23 @@ data = [
     {"name": "Charlie", "age": 30},
 ]
 
-def test_build_store_full():
+def test_build_stores_positions_for_every_record():
     """
-    Test that build() stores full records when store_full=True
+    Test that build() indexes every record by its position
     """
     indexer = Indexer()
-    indexer.build(data, store_full=True)
+    indexer.build(data)
     
-    # The stored items should be dicts (full records)
-    assert isinstance(indexer.indexes["name"]["Alice"][0], dict)
+    assert indexer.indexes["name"]["Alice"] == [0, 2]
     # Check that there are 2 records with age 30
     assert len(indexer.indexes["age"][30]) == 2
 
 def test_build_store_indices():
     """
-    Test that build() stores only indices when store_full=False
+    Test that build() stores only indices
     """
     indexer = Indexer()
-    indexer.build(data, store_full=False)
+    indexer.build(data)
     
     # The stored items should be integers (indices)
     assert isinstance(indexer.indexes["name"]["Alice"][0], int)
@@ -40,7 +39,7 @@ def test_query_without_index():
     Test query() fallback when use_index=False
     """
     indexer = Indexer()
-    indexer.build(data, store_full=False)
+    indexer.build(data)
     
     results = indexer.query({"name": "Bob", "age": 25}, use_index=False)
     assert results == [{"name": "Bob", "age": 25}]
@@ -50,7 +49,7 @@ def test_query_missing_key():
     Test query() when the key is missing in indexes
     """
     indexer = Indexer()
-    indexer.build(data, store_full=False)
+    indexer.build(data)
     
     results = indexer.query({"city": "NY"}, use_index=True)
     # Should fallback to scanning and return empty list
@@ -61,7 +60,291 @@ def test_query_multiple_conditions():
     Test query() with multiple conditions
     """
     indexer = Indexer()
-    indexer.build(data, store_full=False)
+    indexer.build(data)
     
     results = indexer.query({"name": "Alice", "age": 30}, use_index=True)
     assert results == [{"name": "Alice", "age": 30}]
+
+def test_positions_single_equality_uses_index():
+    """
+    Test positions() answers a single equality condition from the index
+    """
+    indexer = Indexer()
+    indexer.build(data)
+
+    assert indexer.positions({"name": "Alice"}) == [0, 2]
+    assert indexer.positions({"city": "NY"}) == []
+
+def test_positions_with_operators():
+    """
+    Test positions() scans for operator and multi-field conditions
+    """
+    indexer = Indexer()
+    indexer.build(data)
+
+    assert indexer.positions({"age": {"$gt": 26}}) == [0, 3]
+    assert indexer.positions({"name": "Alice", "age": 25}) == [2]
+
+def test_build_skips_unhashable_values():
+    """
+    Test build() tolerates unhashable field values
+    """
+    indexer = Indexer()
+    indexer.build([{"id": 1, "tags": ["a"]}, {"id": 2, "tags": ["b"]}])
+
+    assert indexer.indexes["tags"] == {}
+    assert indexer.positions({"tags": ["b"]}) == [1]
+
+def test_notify_update_moves_postings():
+    """
+    Test notify_update() keeps the index in step with an in-place update
+    """
+    records = [dict(r) for r in data]
+    indexer = Indexer()
+    indexer.build(records)
+
+    records[1]["name"] = "Alice"
+    indexer.notify_update(1, {"name": "Bob"}, {"name": "Alice"})
+    records[3]["city"] = "NY"
+    indexer.notify_update(3, {}, {"city": "NY"})
+
+    assert indexer.positions({"name": "Alice"}) == [0, 1, 2]
+    assert indexer.positions({"name": "Bob"}) == []
+    assert "Bob" not in indexer.indexes["name"]
+    assert indexer.positions({"city": "NY"}) == [3]
+
+def test_remove_matches_rebuild():
+    """
+    Test remove() leaves the same indexes as rebuilding after a delete
+    """
+    records = [{"id": i, "group": i % 3, "score": i * 1.5} for i in range(20)]
+    indexer = Indexer()
+    indexer.build(records)
+    indexer.positions({"score": {"$gt": 4}})  # Build the range index
+
+    removed = [0, 3, 4, 9, 19]
+    for pos in reversed(removed):
+        del records[pos]
+    indexer.remove(removed)
+
+    rebuilt = Indexer()
+    rebuilt.build(list(records))
+    assert indexer.indexes == rebuilt.indexes
+    assert indexer._sorted["score"] == rebuilt._sorted_index("score")
+    assert indexer.query({"score": {"$lt": 12}, "group": 1}) == [
+        {"id": 1, "group": 1, "score": 1.5},
+        {"id": 7, "group": 1, "score": 10.5},
+    ]
+
+def test_postings_built_on_first_use():
+    """
+    Test writes before the first query leave the postings unbuilt
+    """
+    records = [{"id": i, "group": i % 2} for i in range(6)]
+    indexer = Indexer()
+    indexer.build(records)
+
+    records.append({"id": 6, "group": 0})
+    indexer.add(records[6], 6)
+    records[1]["group"] = 0
+    indexer.notify_update(1, {"group": 1}, {"group": 0})
+    del records[0]
+    indexer.remove([0])
+    assert indexer._stale and indexer._indexes == {}
+
+    assert indexer.positions({"group": 0}) == [0, 1, 3, 5]
+    assert not indexer._stale
+    fresh = Indexer()
+    fresh.build(records)
+    assert indexer.indexes == fresh.indexes
+
+def test_compile_reuses_plan_per_shape():
+    """
+    Test queries differing only in their values share one compiled plan
+    """
+    indexer = Indexer()
+    indexer.build(data)
+
+    assert indexer.query({"age": {"$gt": 26}}, use_index=False) == [data[0], data[3]]
+    assert indexer.query({"age": {"$gt": 29}, "name": {"$ne": "Alice"}}) == [data[3]]
+    assert indexer.query({"age": {"$gt": 10}}, use_index=False) == data
+    assert len(indexer._plan_cache) == 2
+
+def test_compiled_predicate_matches_matches_query():
+    """
+    Test compiled predicates agree with matches_query() for every operator
+    """
+    from jflatdb.indexer import matches_query
+
+    records = data + [{"name": None, "age": None}, {"age": "30"}, {}]
+    queries = [
+        {"age": {"$gte": 25, "$lt": 30}},
+        {"age": {"$ne": 25}},
+        {"age": {"$in": [25, "30"]}},
+        {"age": {"$in": 5}},
+        {"age": {"$between": [25, 30]}},
+        {"age": {"$between": 25}},
+        {"name": {"$like": "a%"}},
+        {"name": {"$like": "%li%"}, "age": 30},
+        {"age": {"$unknown": 1}},
+    ]
+    indexer = Indexer()
+    for query in queries:
+        predicate = indexer.compile(query)
+        for record in records:
+            assert predicate(record) == matches_query(record, query)
+
+def test_compiled_predicate_with_unusual_field_names():
+    """
+    Test field names are passed to generated predicates, not spliced in
+    """
+    indexer = Indexer()
+    record = {"it's": 1, "a\nb": 5, "x) or (1": 2}
+    assert indexer.compile({"it's": 1, "a\nb": {"$gt": 4}})(record)
+    assert not indexer.compile({"x) or (1": {"$in": [3]}})(record)
+
+def test_range_index_matches_scan():
+    """
+    Test range queries answered through the sorted index equal a scan
+    """
+    records = [
+        {"age": 30}, {"age": 25.5}, {"age": None}, {"age": "40"}, {},
+        {"age": True}, {"age": float("nan")}, {"age": 25, "name": "Bob"},
+        {"age": 41}, {"age": [1]},
+    ]
+    queries = [
+        {"age": {"$gt": 25}},
+        {"age": {"$gte": 25, "$lt": 41}},
+        {"age": {"$lte": 1}},
+        {"age": {"$between": [25, 30]}},
+        {"age": {"$between": [30, 25]}},
+        {"age": {"$gt": 20, "$ne": 30}},
+        {"age": {"$gt": 20}, "name": "Bob"},
+    ]
+    indexer = Indexer()
+    indexer.build(records)
+    for query in queries:
+        assert indexer.query(query) == indexer.query(query, use_index=False)
+    assert "age" in indexer._sorted
+
+def test_range_slice_not_rechecked():
+    """
+    Test records selected by the sorted index skip the range predicate
+    """
+    records = [{"age": age, "name": name} for age in (20, 25, 30) for name in "ab"]
+    indexer = Indexer()
+    indexer.build(records)
+    compiled = []
+    compile_query = indexer.compile
+    indexer.compile = lambda conditions: compiled.append(conditions) or compile_query(conditions)
+
+    assert indexer.positions({"age": {"$gte": 22, "$lte": 30}}) == [2, 3, 4, 5]
+    assert indexer.positions({"age": {"$between": [25, 30]}, "name": {"$ne": "a"}}) == [3, 5]
+    assert compiled == [{"name": {"$ne": "a"}}]
+
+def test_range_index_extended_on_add():
+    """
+    Test appending a record extends the sorted index instead of dropping it
+    """
+    records = [{"age": 30}, {"age": 20}]
+    indexer = Indexer()
+    indexer.build(records)
+    assert indexer.positions({"age": {"$gt": 25}}) == [0]
+
+    records.append({"age": 40})
+    indexer.add(records[2], 2)
+    records.append({"age": 30})
+    indexer.add(records[3], 3)
+    assert indexer._sorted["age"] == ([20, 30, 30, 40], [1, 0, 3, 2])
+    assert indexer.positions({"age": {"$gt": 25}}) == [0, 2, 3]
+
+def test_combined_conditions_match_scan():
+    """
+    Test queries driven by the most selective index agree with a scan
+    """
+    records = [
+        {"name": name, "age": age, "city": city}
+        for name in ("Alice", "Bob", None)
+        for age in (20, 25.0, 30, "30", None)
+        for city in ("NY", "LA")
+    ]
+    queries = [
+        {"name": "Alice", "city": "NY"},
+        {"name": "Bob", "age": 30},
+        {"name": "Alice", "age": {"$gte": 25}, "city": {"$ne": "LA"}},
+        {"age": {"$lt": 30}, "city": "LA"},
+        {"name": "Carol", "age": 20},
+        {"name": None, "city": "NY"},
+        {"name": {"$like": "a%"}, "city": "NY"},
+    ]
+    from jflatdb.indexer import matches_query
+
+    indexer = Indexer()
+    indexer.build(records)
+    for query in queries:
+        assert indexer.query(query) == indexer.query(query, use_index=False)
+        assert indexer.positions(query) == [
+            idx for idx, record in enumerate(records)
+            if matches_query(record, query)
+        ]
+
+def test_equality_postings_intersected():
+    """
+    Test multiple equality conditions are answered from the postings alone
+    """
+    records = [{"group": i % 3, "flag": i % 2 == 0} for i in range(12)]
+    indexer = Indexer()
+    indexer.build(records)
+
+    def fail(item):
+        raise AssertionError("candidates should not be rechecked")
+
+    indexer.compile = lambda conditions: fail
+    assert indexer.positions({"group": 0, "flag": True}) == [0, 6]
+    assert indexer.positions({"group": 1, "flag": True}) == [4, 10]
+    assert indexer.positions({"group": 5, "flag": True}) == []
+
+def test_intersected_equalities_not_rechecked():
+    """
+    Test only equalities left out of the intersection are checked per record
+    """
+    records = [{"id": i, "group": i % 100, "flag": i % 2 == 0} for i in range(400)]
+    indexer = Indexer()
+    indexer.build(records)
+    compiled = []
+    compile_query = indexer.compile
+    indexer.compile = lambda conditions: compiled.append(conditions) or compile_query(conditions)
+
+    # flag's postings are too large to intersect with the four ids
+    assert indexer.positions({"group": 3, "flag": False, "id": {"$lt": 300}}) == [3, 103, 203]
+    assert compiled == [{"flag": False, "id": {"$lt": 300}}]
+
+def test_like_patterns_compiled_once():
+    """
+    Test $like patterns are compiled once and reused across queries
+    """
+    from jflatdb.indexer import _compile_like
+
+    _compile_like.cache_clear()
+    indexer = Indexer()
+    indexer.build(data)
+
+    assert indexer.query({"name": {"$like": "a%"}}) == [data[0], data[2]]
+    assert indexer.query({"name": {"$like": "a%"}}) == [data[0], data[2]]
+    info = _compile_like.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+
+def test_like_pattern_drops_redundant_wildcards():
+    """
+    Test leading/trailing % don't turn into .* that search() must backtrack
+    """
+    from jflatdb.indexer import _compile_like
+
+    assert _compile_like("%li%").pattern == "li"
+    assert _compile_like("a%").pattern == "^a"
+    assert _compile_like("%%c").pattern == "c$"
+    assert _compile_like("a%c").pattern == "^a.*c$"
+
+    indexer = Indexer()
+    indexer.build(data + [{"name": "x" * 1000}])
+    assert indexer.query({"name": {"$like": "%LI%"}}) == [data[0], data[2], data[3]]
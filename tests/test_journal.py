@@ -0,0 +1,273 @@
+import os
+
+import jflatdb.storage as storage_module
+from jflatdb.database import Database
+from jflatdb.storage import Storage
+
+
+def _patch_storage_init_to_tmp(tmp_path, monkeypatch):
+    """Patch Storage to use temp directory for testing"""
+    def _init(self, filename):
+        self.folder = str(tmp_path)
+        self.filepath = os.path.join(self.folder, filename)
+        self.wal_path = os.path.join(self.folder, f"{filename}.wal")
+        os.makedirs(self.folder, exist_ok=True)
+        return None
+
+    monkeypatch.setattr(storage_module.Storage, "__init__", _init)
+
+
+class TestStorageJournal:
+    """Test the append-only journal of Storage"""
+
+    def test_append_and_read(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        storage = Storage('test.json')
+        storage.append_journal("first")
+        storage.append_journal("line\nwith:separators\r")
+
+        assert storage.read_journal() == ["first", "line\nwith:separators\r"]
+
+    def test_torn_entry_is_ignored(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        storage = Storage('test.json')
+        storage.append_journal("complete")
+        with open(storage.journal_path, 'a', encoding='utf-8') as f:
+            f.write("20:partial")
+
+        assert storage.read_journal() == ["complete"]
+
+    def test_torn_entry_is_cut_off(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        storage = Storage('test.json')
+        storage.append_journal("caf\u00e9")
+        with open(storage.journal_path, 'ab') as f:
+            f.write("5:caf\u00e9".encode('utf-8')[:-1])
+
+        assert storage.read_journal() == ["caf\u00e9"]
+        storage.append_journal("next")
+        assert storage.read_journal() == ["caf\u00e9", "next"]
+        storage.close()
+
+    def test_write_clears_journal(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        storage = Storage('test.json')
+        storage.append_journal("entry")
+        storage.write("snapshot")
+
+        assert storage.read_journal() == []
+
+    def test_append_handle_kept_open(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        storage = Storage('test.json')
+        storage.append_journal("caf\u00e9")
+        handle = storage._journal_file
+        storage.append_journal("second")
+        assert storage._journal_file is handle
+
+        # Another instance checkpoints and removes the journal
+        Storage('test.json').clear_journal()
+        storage.append_journal("third")
+        assert storage._journal_file is not handle
+        assert storage.read_journal() == ["third"]
+
+        storage.write("snapshot")
+        assert storage._journal_file is None
+
+        # A storage dropped without close() releases its handle
+        storage.append_journal("fourth")
+        handle = storage._journal_file
+        del storage
+        assert handle.closed
+
+    def test_write_preserves_line_endings(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        # Encrypted payloads can contain any character, e.g. "u" ^ 120
+        storage = Storage('test.json')
+        storage.write("a\rb\r\nc\n")
+
+        assert storage.read() == "a\rb\r\nc\n"
+
+    def test_write_syncs_wal_and_file(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        synced = []
+        real_fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+        storage = Storage('test.json')
+        storage.write("\u00e9t\u00e9")
+        assert storage.read() == "\u00e9t\u00e9"
+        assert len(synced) >= 2  # WAL and temp file, plus the folder on POSIX
+
+        synced.clear()
+        monkeypatch.setattr(Storage, "fsync", False)
+        storage.write("plain")
+        assert storage.read() == "plain"
+        assert synced == []
+
+    def test_transaction_commit_syncs_journal_entry(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many({"id": i} for i in range(8))
+        db.close()
+
+        synced = []
+        real_fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+        db.insert({"id": 8})
+        assert synced == []
+
+        with db.transaction() as txn:
+            txn.update({"id": 3}, {"name": "Carol"})
+        assert synced and db._journal_size == 2
+        assert Database('test.json', password='test').data == db.data
+
+    def test_concurrent_syncs_share_one_flush(self):
+        import threading
+        from jflatdb.storage import _JournalSync
+
+        group = _JournalSync()
+        flushes = []
+        barrier = threading.Barrier(8)
+
+        def commit():
+            ticket = group.wrote()
+            barrier.wait()
+            group.sync(ticket, lambda: flushes.append(group.written))
+
+        threads = [threading.Thread(target=commit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert flushes == [8]
+        assert group.synced == 8
+
+    def test_unchanged_write_is_skipped(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        replaced = []
+        real_replace = os.replace
+        monkeypatch.setattr(os, "replace", lambda *a: (replaced.append(a), real_replace(*a)))
+        storage = Storage('test.json')
+        storage.write("snapshot")
+        storage.append_journal("entry")
+        storage.write("snapshot")
+        assert len(replaced) == 1
+        assert storage.read_journal() == []
+
+        os.remove(storage.filepath)
+        storage.write("snapshot")
+        assert len(replaced) == 2
+        assert storage.read() == "snapshot"
+
+    def test_wal_recovery_discards_journal(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        storage = Storage('test.json')
+        storage.append_journal("entry")
+        storage._write_wal("snapshot")
+
+        assert storage.recover_from_wal() is True
+        assert storage.read() == "snapshot"
+        assert storage.read_journal() == []
+
+
+class TestDatabaseJournal:
+    """Test that inserts are journaled instead of rewriting the file"""
+
+    def test_insert_appends_to_journal(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 1, "name": "Alice"})
+        db.insert({"id": 2, "name": "Bob"})
+
+        assert not os.path.exists(db.storage.filepath)
+        assert len(db.storage.read_journal()) == 2
+
+        db2 = Database('test.json', password='test')
+        assert db2.data == [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}]
+        assert db2.find({"name": "Bob"}) == [{"id": 2, "name": "Bob"}]
+
+    def test_checkpoint_every_interval(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test', checkpoint_interval=3)
+        for i in range(4):
+            db.insert({"id": i})
+
+        # The third insert checkpointed, the fourth is journaled
+        assert len(db.storage.read_journal()) == 1
+
+        db2 = Database('test.json', password='test')
+        assert [r["id"] for r in db2.data] == [0, 1, 2, 3]
+
+    def test_update_and_delete_are_journaled(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many([{"id": i, "group": i % 2} for i in range(5)])
+        db.update({"group": 1}, {"group": 2, "seen": True})
+        db.delete({"id": {"$in": [0, 3]}})
+        db.delete({"id": 4})
+
+        assert not os.path.exists(db.storage.filepath)
+        assert len(db.storage.read_journal()) == 4
+
+        db2 = Database('test.json', password='test')
+        assert db2.data == db.data
+        assert db2.data == [
+            {"id": 1, "group": 2, "seen": True}, {"id": 2, "group": 0}
+        ]
+
+    def test_compacts_when_journal_outgrows_file(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+        monkeypatch.setattr(Database, "JOURNAL_MIN_BYTES", 0)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 0, "text": "x" * 100})
+
+        # With no floor, a journal larger than half the file compacts
+        assert db.storage.read_journal() == []
+        db.insert({"id": 1})
+        assert len(db.storage.read_journal()) == 1
+        db.insert({"id": 2, "text": "y" * 100})
+        assert db.storage.read_journal() == []
+        assert Database('test.json', password='test').data == db.data
+
+    def test_appends_after_torn_entry_survive(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        for torn in ("9999:partial", "3:ab"):
+            db = Database(f'{len(torn)}.json', password='test')
+            db.insert({"id": 1})
+            db.storage.close()
+            with open(db.storage.journal_path, 'a', encoding='utf-8') as f:
+                f.write(torn)  # Crash halfway through an append
+
+            db2 = Database(f'{len(torn)}.json', password='test')
+            assert db2.data == [{"id": 1}]
+            db2.insert({"id": 2})
+            db2.storage.close()
+
+            db3 = Database(f'{len(torn)}.json', password='test')
+            assert db3.data == [{"id": 1}, {"id": 2}]
+            db3.close()
+
+    def test_close_checkpoints(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 1})
+        db.close()
+
+        assert db.storage.read_journal() == []
+        assert Database('test.json', password='test').data == [{"id": 1}]
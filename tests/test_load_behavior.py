@@ -45,3 +45,19 @@ def test_corrupt_file_raises_runtimeerror(tmp_path, monkeypatch):
 
     with pytest.raises(RuntimeError):
         Database('corrupt.json', password='x')
+
+
+def test_share_strings_on_load(tmp_path, monkeypatch):
+    _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+    db = Database('shared.json', password='x')
+    db.insert_many([{"id": i, "status": "active", "tags": ["a"]} for i in range(3)])
+    db.close()
+
+    plain = Database('shared.json', password='x')
+    assert plain.data[0]["status"] is not plain.data[1]["status"]
+
+    shared = Database('shared.json', password='x', share_strings=True)
+    assert shared.data == plain.data
+    assert shared.data[0]["status"] is shared.data[1]["status"]
+    assert shared.find({"status": "active"}) == shared.data
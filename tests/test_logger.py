@@ -0,0 +1,17 @@
+from jflatdb.utils.logger import Logger
+
+
+def test_messages_below_level_are_not_formatted(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    logger = Logger(level='warn')
+
+    class Loud:
+        def __str__(self):
+            raise AssertionError("formatted a dropped message")
+
+    logger.info("queued insert %s", Loud())
+    logger.warn("%d records skipped", 3)
+    logger.error("100% done")
+
+    assert capsys.readouterr().out.splitlines()[0].endswith("[WARN] 3 records skipped")
+    assert (tmp_path / "logs" / "db.log").read_text().count("\n") == 2
@@ -30,6 +30,7 @@ class TestMethodChaining(unittest.TestCase):
 
     def tearDown(self):
         """Clean up temporary files"""
+        self.db.close()  # Fold the journal into the main file
         if os.path.exists(self.db_path):
             os.remove(self.db_path)
         os.rmdir(self.temp_dir)
@@ -41,6 +42,23 @@ class TestMethodChaining(unittest.TestCase):
         for result in results:
             self.assertEqual(result["status"], "active")
 
+    def test_fetch_leaves_indexer_data_intact(self):
+        """Test that fetching doesn't narrow the data later writes work on"""
+        self.db.table("users").filter(status="active").filter(age__gt=29).fetch()
+        self.assertIs(self.db.indexer.data, self.db.data)
+
+        self.db.delete({"age": {"$gt": 33}})
+        self.assertEqual([r["id"] for r in self.db.data], [1, 2, 4, 5])
+
+    def test_delete_many_keeps_order(self):
+        """Test deleting several records keeps the rest in order"""
+        self.db.delete({"status": "inactive"})
+        self.assertEqual([r["id"] for r in self.db.data], [1, 2, 4])
+        self.assertIs(self.db.indexer.data, self.db.data)
+
+        self.db.delete({"status": "missing"})
+        self.assertEqual(len(self.db.table("users").fetch()), 3)
+
     def test_filter_with_operators(self):
         """Test filter with operator-based queries"""
         results = self.db.table("users").filter(age__gt=30).fetch()
@@ -120,11 +138,51 @@ class TestMethodChaining(unittest.TestCase):
             self.assertEqual(result["status"], "active")
             self.assertGreater(result["age"], 26)
 
+    def test_filters_on_same_field_are_merged(self):
+        """Test filters on one field combine instead of replacing each other"""
+        builder = (
+            self.db.table("users")
+            .filter(age__gt=26)
+            .filter(age__lt=33)
+            .filter(age__gt=29)
+        )
+        self.assertEqual(
+            builder._merged_filters(),
+            ({"age": {"$gt": 26, "$lt": 33}}, [{"age": {"$gt": 29}}])
+        )
+        self.assertEqual([r["id"] for r in builder.fetch()], [1, 5])
+        self.assertEqual(
+            self.db.table("users").filter(status="active").filter(status="active").count(),
+            3
+        )
+
     def test_count_method(self):
         """Test count method on query chain"""
         count = self.db.table("users").filter(status="active").count()
         self.assertEqual(count, 3)
 
+    def test_repeated_count_hits_cache(self):
+        """Test repeating a chain is answered from the query cache"""
+        self.db.table("users").filter(status="active").filter(age__gt=26).count()
+        hits = self.db.get_cache_stats()["hits"]
+        count = self.db.table("users").filter(age__gt=26).filter(status="active").count()
+        self.assertEqual(count, 2)
+        self.assertEqual(self.db.get_cache_stats()["hits"], hits + 1)
+
+        self.db.insert({"id": 6, "name": "Frank", "age": 40, "status": "active"})
+        count = self.db.table("users").filter(status="active", age__gt=26).count()
+        self.assertEqual(count, 3)
+
+    def test_fetch_returns_own_list(self):
+        """Test modifying a fetched list doesn't leak into the cache"""
+        results = self.db.table("users").filter(status="active").fetch()
+        results.append("junk")
+        self.db.table("users").fetch().append("junk")
+
+        self.assertNotIn("junk", self.db.table("users").filter(status="active").fetch())
+        self.assertNotIn("junk", self.db.find({"status": "active"}))
+        self.assertEqual(len(self.db.data), 5)
+
     def test_first_method(self):
         """Test first method returns single result"""
         result = self.db.table("users").filter(status="active").sort("age").first()
@@ -177,6 +235,11 @@ class TestMethodChaining(unittest.TestCase):
         for result in results:
             self.assertNotEqual(result["status"], "inactive")
 
+    def test_equality_combined_with_operator(self):
+        """Test a field filtered by value and operator keeps both conditions"""
+        results = self.db.table("users").filter(age=30, age__gt=25).fetch()
+        self.assertEqual([r["id"] for r in results], [1])
+
     def test_empty_filter(self):
         """Test empty filter returns all results"""
         results = self.db.table("users").filter().fetch()
@@ -253,6 +316,7 @@ class TestMethodChainingEdgeCases(unittest.TestCase):
 
     def tearDown(self):
         """Clean up temporary files"""
+        self.db.close()  # Fold the journal into the main file
         if os.path.exists(self.db_path):
             os.remove(self.db_path)
         os.rmdir(self.temp_dir)
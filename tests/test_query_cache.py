@@ -44,6 +44,16 @@ class TestQueryCacheBasics:
         assert cached == result
         assert cache.hits == 1
 
+    def test_results_stored_without_copy(self):
+        cache = QueryCache()
+        result = [{"id": 1}]
+        cache.set({"id": 1}, result)
+        assert cache.get({"id": 1}) is result
+
+        cache.copy_on_get = True
+        copied = cache.get({"id": 1})
+        assert copied == result and copied is not result
+
     def test_cache_key_consistency(self):
         """Test that same query dict produces same cache key"""
         cache = QueryCache()
@@ -58,6 +68,31 @@ class TestQueryCacheBasics:
         # Should hit cache with different key order
         assert cache.get(query2) == result
 
+    def test_precomputed_key(self):
+        """Test get/set accept a key computed once with make_key"""
+        cache = QueryCache()
+        query = {"age": {"$gt": 30}}
+        key = cache.make_key(query)
+
+        cache.set(query, [{"age": 35}], key)
+        assert cache.get(query, key) == [{"age": 35}]
+        assert cache.get({"age": {"$gt": 30}}) == [{"age": 35}]
+
+    def test_make_key_distinguishes_value_shapes(self):
+        cache = QueryCache()
+        assert cache.make_key({"x": 1}) != cache.make_key({"x": True})
+        assert cache.make_key({"x": 1}) != cache.make_key({"x": 1.0})
+        assert cache.make_key({"x": {"$in": [1, 2]}}) == cache.make_key({"x": {"$in": [1, 2]}})
+        assert cache.make_key({"x": ["a", "b"]}) != cache.make_key({"x": ("a", "b")})
+
+    def test_make_key_unhashable_leaf(self):
+        cache = QueryCache()
+        query = {"blob": bytearray(b"ab")}
+        key = cache.make_key(query)
+        hash(key)
+        assert key == cache.make_key({"blob": bytearray(b"ab")})
+        assert key != cache.make_key({"blob": b"ab"})
+
     def test_cache_invalidation(self):
         cache = QueryCache()
         cache.set({"name": "Alice"}, [{"name": "Alice"}])
@@ -90,40 +125,128 @@ class TestQueryCacheBasics:
         assert cache.enabled is True
 
     def test_lru_eviction(self):
-        """Test LRU eviction when cache is full"""
-        cache = QueryCache(max_size=3)
+        """Test batched LRU eviction once the cache reaches 2x max_size"""
+        cache = QueryCache(max_size=3, admission=False)
 
-        cache.set({"id": 1}, [{"id": 1}])
-        cache.set({"id": 2}, [{"id": 2}])
-        cache.set({"id": 3}, [{"id": 3}])
+        for i in range(1, 6):
+            cache.set({"id": i}, [{"id": i}])
 
-        # Cache is full
-        assert len(cache.cache) == 3
+        # Below the soft limit nothing is evicted
+        assert len(cache.cache) == 5
 
-        # Add one more - should evict oldest (id=1)
-        cache.set({"id": 4}, [{"id": 4}])
+        # Reaching 2x max_size trims back to max_size, oldest first
+        cache.set({"id": 6}, [{"id": 6}])
         assert len(cache.cache) == 3
         assert cache.get({"id": 1}) is None  # Evicted
-        assert cache.get({"id": 4}) is not None  # Present
+        assert cache.get({"id": 3}) is None  # Evicted
+        assert cache.get({"id": 6}) is not None  # Present
+        assert set(cache.field_index["id"]) == set(cache.cache)
 
     def test_lru_access_updates_order(self):
-        """Test that accessing an item moves it to end (most recent)"""
-        cache = QueryCache(max_size=3)
+        """Test that accessing an item marks it most recently used"""
+        cache = QueryCache(max_size=3, admission=False)
 
-        cache.set({"id": 1}, [{"id": 1}])
-        cache.set({"id": 2}, [{"id": 2}])
-        cache.set({"id": 3}, [{"id": 3}])
+        for i in range(1, 6):
+            cache.set({"id": i}, [{"id": i}])
 
-        # Access id=1 (moves it to end)
+        # Access id=1 (now most recently used)
         cache.get({"id": 1})
 
-        # Add new item - should evict id=2 (now oldest)
-        cache.set({"id": 4}, [{"id": 4}])
+        # Hitting the soft limit evicts id=2..4 (now oldest)
+        cache.set({"id": 6}, [{"id": 6}])
 
         assert cache.get({"id": 1}) is not None  # Still present
         assert cache.get({"id": 2}) is None  # Evicted
-        assert cache.get({"id": 3}) is not None  # Present
-        assert cache.get({"id": 4}) is not None  # Present
+        assert cache.get({"id": 4}) is None  # Evicted
+        assert cache.get({"id": 5}) is not None  # Present
+        assert cache.get({"id": 6}) is not None  # Present
+
+    def test_protected_entries_outlive_newer_probation_entries(self):
+        """Entries hit again are evicted after one-off entries, even newer ones"""
+        cache = QueryCache(max_size=5, admission=False)
+
+        for i in range(1, 4):
+            cache.set({"id": i}, [{"id": i}])
+            cache.get({"id": i})  # Promoted to protected
+
+        for i in range(4, 11):
+            cache.set({"id": i}, [{"id": i}])
+
+        # Batch eviction dropped the oldest probation entries (4..8) only
+        assert set(cache.cache) == {cache.make_key({"id": i}) for i in (1, 2, 3, 9, 10)}
+
+    def test_protected_segment_is_bounded(self):
+        """Protected entries beyond the protected share are demoted"""
+        cache = QueryCache(max_size=5, admission=False)
+
+        for i in range(1, 11):
+            cache.set({"id": i}, [{"id": i}])
+            if i < 9:
+                cache.get({"id": i})
+
+        # At most 4 (80% of 5) stay protected, the oldest are demoted and go
+        protected = {k for k, entry in cache.cache.items() if entry[2]}
+        assert protected == {cache.make_key({"id": i}) for i in (5, 6, 7, 8)}
+        assert len(cache.cache) == 5
+
+    def test_prune(self):
+        """prune() evicts down to max_size (or a given size) immediately"""
+        cache = QueryCache(max_size=3, admission=False)
+
+        for i in range(1, 6):
+            cache.set({"id": i}, [{"id": i}])
+        cache.get({"id": 1})
+
+        assert cache.prune() == 2
+        assert set(cache.cache) == {cache.make_key({"id": i}) for i in (1, 4, 5)}
+        assert cache.prune(1) == 2
+        assert set(cache.cache) == {cache.make_key({"id": 1})}
+        assert cache.prune() == 0
+        assert set(cache.field_index["id"]) == set(cache.cache)
+
+    def test_admission_rejects_one_hit_wonders(self):
+        """Once full, a query no more popular than the LRU victim is not cached"""
+        cache = QueryCache(max_size=3)
+
+        for i in range(1, 4):
+            cache.get({"id": i})
+            cache.set({"id": i}, [{"id": i}])
+
+        # One-off scan queries don't displace the cached ones
+        for i in range(4, 10):
+            assert cache.get({"id": i}) is None
+            cache.set({"id": i}, [{"id": i}])
+
+        assert set(cache.cache) == {cache.make_key({"id": i}) for i in range(1, 4)}
+        assert cache.get_stats()["admission_skipped"] == 6
+        assert set(cache.field_index["id"]) == set(cache.cache)
+
+    def test_admission_admits_popular_query(self):
+        """A query requested more often than the LRU victim is admitted"""
+        cache = QueryCache(max_size=3)
+
+        for i in range(1, 4):
+            cache.get({"id": i})
+            cache.set({"id": i}, [{"id": i}])
+
+        cache.get({"id": 9})
+        cache.get({"id": 9})
+        cache.set({"id": 9}, [{"id": 9}])
+
+        assert cache.get({"id": 9}) == [{"id": 9}]
+        assert cache.admission_skipped == 0
+
+    def test_frequency_sketch_ages(self):
+        """Counters are halved once the sample size is reached"""
+        cache = QueryCache(max_size=5)
+        sketch = cache._cms
+
+        for _ in range(sketch.sample_size - 1):
+            sketch.increment("hot")
+        assert sketch.frequency("hot") == sketch.MAX_COUNT
+
+        sketch.increment("hot")
+        assert sketch.frequency("hot") == sketch.MAX_COUNT // 2
 
     def test_cache_stats(self):
         cache = QueryCache(max_size=10)
@@ -146,6 +269,59 @@ class TestQueryCacheBasics:
         assert stats["misses"] == 1
         assert stats["size"] == 1
         assert stats["hit_rate"] == "50.00%"
+        assert stats["admission_skipped"] == 0
+
+    def test_invalidate_records_only_drops_matching_queries(self):
+        cache = QueryCache()
+        cache.set({"age": {"$gt": 25}}, [{"age": 30}])
+        cache.set({"age": {"$lt": 25}}, [{"age": 20}])
+        cache.set({}, [{"age": 30}, {"age": 20}])
+
+        cache.invalidate_records([{"age": 40}])
+
+        assert cache.get({"age": {"$gt": 25}}) is None
+        assert cache.get({"age": {"$lt": 25}}) == [{"age": 20}]
+        assert cache.get({}) is None  # Empty query matches every record
+
+    def test_large_batches_clear_instead_of_checking(self):
+        cache = QueryCache()
+        cache.MAX_INVALIDATION_CHECKS = 4
+        cache.set({"age": {"$gt": 25}}, [{"age": 30}])
+        cache.set({"age": {"$lt": 25}}, [{"age": 20}])
+
+        cache.invalidate_records([{"age": 40}, {"age": 41}])
+        assert cache.get({"age": {"$lt": 25}}) == [{"age": 20}]
+
+        cache.invalidate_records([{"age": 40}] * 5)
+        assert cache.get_stats()["size"] == 0
+
+        cache.set({"age": {"$lt": 25}}, [{"age": 20}])
+        cache.set({"name": "Bob"}, [])
+        cache.invalidate_fields(["age"], [{"age": 40}] * 5)
+        assert cache.get({"age": {"$lt": 25}}) is None
+        assert cache.get({"name": "Bob"}) == []
+
+    def test_invalidate_fields_only_drops_readers(self):
+        cache = QueryCache()
+        cache.set({"name": "Alice"}, [{"name": "Alice", "age": 25}])
+        cache.set({"age": 25}, [{"name": "Alice", "age": 25}])
+
+        cache.invalidate_fields(["age"])
+
+        assert cache.get({"age": 25}) is None
+        assert cache.get({"name": "Alice"}) is not None
+        assert "age" not in cache.field_index
+
+    def test_invalidate_fields_with_record_images(self):
+        cache = QueryCache()
+        cache.set({"age": {"$gt": 50}}, [])
+        cache.set({"age": {"$lt": 30}}, [{"age": 25}])
+
+        # age 25 -> 26: only the "< 30" query could change
+        cache.invalidate_fields(["age"], [{"age": 25}, {"age": 26}])
+
+        assert cache.get({"age": {"$gt": 50}}) == []
+        assert cache.get({"age": {"$lt": 30}}) is None
 
     def test_reset_stats(self):
         cache = QueryCache()
@@ -212,9 +388,14 @@ class TestDatabaseCacheIntegration:
         db.find({"name": "Alice"})
         assert len(db.cache.cache) > 0
 
-        # Insert should invalidate cache
+        # Inserting a record the query doesn't match keeps the entry
         db.insert({"id": 2, "name": "Bob"})
+        assert len(db.cache.cache) == 1
+
+        # Inserting a matching record invalidates it
+        db.insert({"id": 3, "name": "Alice"})
         assert len(db.cache.cache) == 0
+        assert len(db.find({"name": "Alice"})) == 2
 
     def test_cache_invalidation_on_update(self, tmp_path, monkeypatch):
         _patch_storage_init_to_tmp(tmp_path, monkeypatch)
@@ -227,10 +408,67 @@ class TestDatabaseCacheIntegration:
         db.find({"name": "Alice"})
         assert len(db.cache.cache) > 0
 
-        # Update should invalidate cache
+        # Updating a field the query doesn't read keeps the entry
         db.update({"name": "Alice"}, {"age": 26})
+        assert len(db.cache.cache) == 1
+        assert db.find({"name": "Alice"})[0]["age"] == 26
+
+        # Updating a field the query reads invalidates it
+        db.update({"name": "Alice"}, {"name": "Alicia"})
+        assert db.find({"name": "Alice"}) == []
+
+    def test_noop_update_keeps_cache_and_file(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 1, "name": "Alice", "age": 25})
+        db.insert({"id": 2, "name": "Bob", "age": 30})
+        db.find({"age": 25})
+
+        entries = len(db.storage.read_journal())
+
+        assert db.update({"name": "Alice"}, {"age": 25}) == 0
+        assert db.update({"name": "Nobody"}, {"age": 1}) == 0
+        assert len(db.storage.read_journal()) == entries
+        assert len(db.cache.cache) == 1
+
+        assert db.update({"age": {"$gte": 25}}, {"age": 30}) == 1
+        assert len(db.storage.read_journal()) == entries + 1
+        assert db.find({"age": 25}) == []
+
+    def test_find_all_bypasses_cache(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 1, "name": "Alice"})
+
+        assert db.find({}) is db.data
+        assert db.cache.misses == 0
         assert len(db.cache.cache) == 0
 
+    def test_find_list_and_tuple_cached_separately(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 1, "tags": ["a", "b"]})
+
+        assert db.find({"tags": ["a", "b"]}) == [{"id": 1, "tags": ["a", "b"]}]
+        assert db.find({"tags": ("a", "b")}) == []
+
+    def test_update_bypasses_cache(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+
+        db.insert({"id": 1, "name": "Alice"})
+        db.update({"name": "Alice"}, {"name": "Alicia"})
+
+        assert db.cache.misses == 0
+        assert len(db.cache.cache) == 0
+        # The index follows the update, so delete finds the new value
+        db.delete({"name": "Alicia"})
+        assert db.data == []
+
     def test_cache_invalidation_on_delete(self, tmp_path, monkeypatch):
         _patch_storage_init_to_tmp(tmp_path, monkeypatch)
 
@@ -243,9 +481,35 @@ class TestDatabaseCacheIntegration:
         db.find({"name": "Alice"})
         assert len(db.cache.cache) > 0
 
-        # Delete should invalidate cache
+        # Deleting a record the query doesn't match keeps the entry
         db.delete({"name": "Bob"})
-        assert len(db.cache.cache) == 0
+        assert len(db.cache.cache) == 1
+
+        # Deleting a matching record invalidates it
+        db.delete({"name": "Alice"})
+        assert db.find({"name": "Alice"}) == []
+
+    def test_transaction_commit_keeps_unaffected_entries(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many(
+            {"id": i, "name": f"user{i}", "group": i % 4} for i in range(12)
+        )
+        db.find({"group": 0})
+        db.find({"group": 1})
+        db.find({"name": "user2"})
+
+        with db.transaction() as txn:
+            txn.update({"id": 4}, {"group": 1})
+            txn.insert({"id": 12, "name": "user12", "group": 3})
+
+        # Only the queries whose results changed were dropped
+        assert len(db.cache.cache) == 1
+        hits = db.cache.hits
+        assert db.find({"name": "user2"})[0]["id"] == 2
+        assert db.cache.hits == hits + 1
+        assert [r["id"] for r in db.find({"group": 1})] == [1, 4, 5, 9]
 
     def test_cache_management_methods(self, tmp_path, monkeypatch):
         _patch_storage_init_to_tmp(tmp_path, monkeypatch)
@@ -286,7 +550,7 @@ class TestDatabaseCacheIntegration:
         # Different queries
         db.find({"name": "Alice"})
         db.find({"age": 30})
-        db.find({})
+        db.find({"id": {"$gte": 3}})
 
         # All should be cached
         assert len(db.cache.cache) == 3
@@ -298,6 +562,20 @@ class TestDatabaseCacheIntegration:
         stats = db.get_cache_stats()
         assert stats["hits"] == 2
 
+    def test_find_cached(self, tmp_path, monkeypatch):
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 1, "age": 35})
+
+        query = {"age": {"$gt": 30}}
+        key = db.cache.make_key(query)
+
+        assert db.find_cached(key, query) == [{"id": 1, "age": 35}]
+        assert db.find_cached(key, query) == [{"id": 1, "age": 35}]
+        assert db.cache.hits == 1
+        assert db.cache.misses == 1
+
     def test_cache_with_operators(self, tmp_path, monkeypatch):
         _patch_storage_init_to_tmp(tmp_path, monkeypatch)
 
@@ -1,4 +1,5 @@
 from jflatdb.query_engine import QueryEngine
+from jflatdb.indexer import Indexer
 import pytest
 from jflatdb.exceptions.errors import QueryError
 
@@ -175,6 +176,28 @@ class TestBetweenFunction:
         ])
         assert engine.between("age", 18, 30) == [{"age": 25}, {"age": 30}]
 
+    def test_between_skips_uncomparable_values(self):
+        engine = QueryEngine([{"age": 25}, {"age": None}, {"age": "x"}, {}])
+        assert engine.between("age", 18, 30) == [{"age": 25}]
+
+    def test_between_outside_cached_range(self):
+        engine = QueryEngine([{"age": 25}, {"age": 35}])
+        engine.min("age")
+        assert engine.between("age", 40, 50) == []
+        assert engine.between("age", 30, 50) == [{"age": 35}]
+
+    def test_between_through_range_index(self):
+        records = [
+            {"age": 25}, {"age": 17.5}, {"age": None}, {"age": "x"}, {},
+            {"age": 30}, {"age": float("nan")}, {"age": 18},
+        ]
+        indexer = Indexer()
+        indexer.build(records)
+        engine = QueryEngine(records, indexer)
+        assert engine.between("age", 18, 30) == [{"age": 25}, {"age": 30}, {"age": 18}]
+        assert "age" in indexer._sorted
+        assert engine.between("age", 17, 18) == QueryEngine(records).between("age", 17, 18)
+
 
 class TestGroupByFunction:
     """Test suite for QueryEngine.group_by() method"""
@@ -194,3 +217,116 @@ class TestGroupByFunction:
             "B": [{"category": "B", "value": 2}]
         }
         assert engine.group_by("category") == expected
+
+    def test_group_by_skips_missing_and_none(self):
+        engine = QueryEngine([
+            {"category": None}, {"category": "A"}, {}, {"category": "B"},
+        ])
+        grouped = engine.group_by("category")
+        assert type(grouped) is dict
+        assert list(grouped) == ["A", "B"]
+
+
+class TestAggregateCache:
+    """Test suite for the cached per-column aggregates"""
+
+    def test_aggregates_cached_per_column(self):
+        engine = QueryEngine([{"age": 20}, {"age": 30}])
+        assert engine.sum("age") == 50
+        assert engine._agg_cache["age"] == (20, 30, 50, 2)
+
+    def test_notify_insert_refreshes_column(self):
+        data = [{"age": 20}, {"age": 30}]
+        engine = QueryEngine(data)
+        assert engine.max("age") == 30
+
+        record = {"age": 40}
+        data.append(record)
+        engine.notify_insert(record)
+        assert engine.max("age") == 40
+        assert engine.avg("age") == 30
+
+    def test_notify_update_and_delete(self):
+        data = [{"age": 20}, {"age": 30}]
+        engine = QueryEngine(data)
+        assert engine.min("age") == 20
+
+        old = dict(data[0])
+        data[0]["age"] = 25
+        engine.notify_update(old, data[0])
+        assert engine.min("age") == 25
+
+        removed = data.pop(0)
+        engine.notify_delete(removed)
+        assert engine.min("age") == 30
+
+    def test_aggregates_maintained_incrementally(self):
+        data = [{"age": 20}, {"age": 30}, {"age": 40}]
+        engine = QueryEngine(data)
+        assert engine.sum("age") == 90
+
+        record = {"age": 10, "name": "x"}
+        data.append(record)
+        engine.notify_insert(record)
+        assert engine._agg_cache["age"] == (10, 40, 100, 4)
+
+        # Removing a non-extremum int adjusts the running state
+        removed = data.pop(1)
+        engine.notify_delete(removed)
+        assert engine._agg_cache["age"] == (10, 40, 70, 3)
+
+        # Removing an extremum falls back to a rescan
+        removed = data.pop(1)
+        engine.notify_delete(removed)
+        assert "age" not in engine._agg_cache
+        assert engine.max("age") == 20
+
+    def test_column_count_maintained_incrementally(self):
+        data = [{"a": 1}, {"a": None}, {"b": 3}]
+        engine = QueryEngine(data)
+        assert engine.count("a") == 1
+
+        record = {"a": "x"}
+        data.append(record)
+        engine.notify_insert(record)
+        old = {"a": None}
+        data[1]["a"] = 2
+        engine.notify_update(old, {"a": 2})
+        data[0]["a"] = None
+        engine.notify_update({"a": 1}, {"a": None})
+        assert engine._count_cache["a"] == 2
+
+        engine.notify_delete(data.pop(3))
+        assert engine.count("a") == 1
+        assert engine.count("a") == QueryEngine(data).count("a")
+
+    def test_summary_matches_builtins(self):
+        values = [3, True, float("nan"), 2.5, -1, 7]
+        data = [{"x": v} for v in values] + [{"x": "9"}, {"x": None}, {}]
+        engine = QueryEngine(data)
+        assert engine.max("x") == max(values)
+        assert engine.min("x") == min(values)
+        total = engine.sum("x")
+        assert total != total  # NaN propagates like in sum()
+        assert engine._agg_cache["x"][3] == len(values)
+
+    def test_float_delete_rescans(self):
+        data = [{"x": 0.1}, {"x": 0.2}, {"x": 0.3}]
+        engine = QueryEngine(data)
+        engine.sum("x")
+
+        removed = data.pop(1)
+        engine.notify_delete(removed)
+        assert engine.sum("x") == sum([0.1, 0.3])
+
+    def test_unnotified_length_change_recomputes(self):
+        data = [{"age": 20}]
+        engine = QueryEngine(data)
+        assert engine.sum("age") == 20
+
+        data.append({"age": 5})
+        assert engine.sum("age") == 25
+
+        data.clear()
+        with pytest.raises(QueryError):
+            engine.min("age")
@@ -0,0 +1,40 @@
+import pytest
+
+from jflatdb.schema import NotNullViolation, Schema
+
+
+def test_validate_fills_defaults_and_checks_types():
+    schema = Schema()
+    schema.add_field("id", int, required=True)
+    schema.add_field("role", str, default="user")
+    schema.add_field("email", str, not_null=True)
+
+    record = {"id": 1, "role": None, "email": "a@x"}
+    assert schema.validate(record, [])
+    assert record == {"id": 1, "role": "user", "email": "a@x"}
+
+    record = {"id": 2, "email": "b@x"}
+    schema.validate(record, [])
+    assert record["role"] == "user"
+
+    with pytest.raises(ValueError):
+        schema.validate({"email": "c@x"}, [])
+    with pytest.raises(TypeError):
+        schema.validate({"id": "3", "email": "c@x"}, [])
+    with pytest.raises(NotNullViolation):
+        schema.validate({"id": 3, "email": None}, [])
+
+
+def test_validate_without_unique_fields_skips_dataset():
+    schema = Schema()
+    schema.add_field("id", int, required=True)
+
+    class NoScan(list):
+        def __iter__(self):
+            raise AssertionError("dataset scanned")
+
+    record = {"id": 1}
+    assert schema.validate(record, NoScan([{"id": 1}]))
+    assert schema.validate_record({"id": 2}) is None
+    with pytest.raises(ValueError):
+        schema.validate_record({})
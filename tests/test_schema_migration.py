@@ -94,6 +94,20 @@ class TestAddField:
         assert data[0]["empty_list"] == []
         assert data[0]["empty_dict"] == {}
 
+    def test_add_field_resolves_default_once(self):
+        """Test NOW() is shared across records but mutable defaults are not"""
+        data = [{"id": 1}, {"id": 2}]
+        migration = SchemaMigration(data)
+
+        migration.add_field("created_at", "NOW()")
+        migration.add_field("tags", ["new"])
+        migration.add_field("meta", "EMPTY_DICT()")
+
+        assert data[0]["created_at"] == data[1]["created_at"]
+        data[0]["tags"].append("edited")
+        assert data[1]["tags"] == ["new"]
+        assert data[0]["meta"] is not data[1]["meta"]
+
 
 class TestRemoveField:
     """Test remove_field migration operation"""
@@ -296,3 +310,45 @@ class TestMultipleOperations:
             assert record["status"] == "active"
             assert "created_at" in record
             assert record["email"] == "unknown@example.com"
+
+    def test_rollback_restores_records_in_place(self):
+        """Test rollback() undoes every operation, keeping key order"""
+        data = [
+            {"id": 1, "fullname": "Alice", "email": None, "tags": ["a"]},
+            {"id": 2, "name": "Bob", "fullname": "Bob B."},
+        ]
+        original = [list(record.items()) for record in data]
+        records = list(data)
+        migration = SchemaMigration(data)
+
+        migration.add_field("status", "active")
+        migration.remove_field("tags")
+        migration.set_default("email", "EMPTY_STRING()")
+        try:
+            migration.rename_field("fullname", "name")
+        except MigrationError:
+            pass
+        migration.rollback()
+
+        assert [list(record.items()) for record in data] == original
+        assert all(a is b for a, b in zip(data, records))
+
+    def test_rollback_restores_direct_changes(self):
+        """Test rollback() also undoes changes made through migration.data"""
+        data = [{"id": 1, "v": 1, "tags": ["a"]}, {"id": 2, "v": 2}]
+        original = [[("id", 1), ("v", 1), ("tags", ["a"])], [("id", 2), ("v", 2)]]
+        records = list(data)
+        migration = SchemaMigration(data)
+
+        migration.add_field("status", "active")
+        for record in migration.data:
+            record["v"] = 100
+        migration.data[0]["tags"].append("b")
+        migration.data.append({"id": 3})
+        migration.rename_field("v", "value")
+        migration.data = []
+        migration.rollback()
+
+        assert migration.result() is data
+        assert [list(record.items()) for record in data] == original
+        assert all(a is b for a, b in zip(data, records))
@@ -119,3 +119,38 @@ class TestSchemaVersion:
 
         history = sv.get_migration_history()
         assert history[0]['name'] == ''
+
+    def test_increments_append_to_log(self, tmp_path):
+        """Test migrations are appended to the log and replayed on load"""
+        sv = SchemaVersion(storage_folder=str(tmp_path), db_name='test_version')
+        with open(sv.metadata_file, encoding='utf-8') as f:
+            snapshot = f.read()
+
+        sv.increment_version('First')
+        sv.increment_version('Second')
+        with open(sv.metadata_file, encoding='utf-8') as f:
+            assert f.read() == snapshot  # JSON file not rewritten
+        with open(sv.log_file, 'a', encoding='utf-8') as f:
+            f.write('{"from_version": 2, "to_')  # Torn append
+
+        sv2 = SchemaVersion(storage_folder=str(tmp_path), db_name='test_version')
+        assert sv2.get_version() == 2
+        assert [m['name'] for m in sv2.get_migration_history()] == ['First', 'Second']
+        assert not os.path.exists(sv2.log_file)  # Compacted
+        sv2.increment_version('Third')
+        sv3 = SchemaVersion(storage_folder=str(tmp_path), db_name='test_version')
+        assert sv3.get_version() == 3
+
+    def test_log_compacted_into_metadata(self, tmp_path):
+        """Test the log is folded into the JSON file once it grows"""
+        sv = SchemaVersion(storage_folder=str(tmp_path), db_name='test_version')
+        sv.LOG_COMPACT_ENTRIES = 3
+
+        for i in range(4):
+            sv.increment_version(f'Migration {i + 1}')
+        with open(sv.log_file, encoding='utf-8') as f:
+            assert len(f.readlines()) == 1
+
+        sv2 = SchemaVersion(storage_folder=str(tmp_path), db_name='test_version')
+        assert sv2.get_migration_history() == sv.get_migration_history()
+        assert sv2.get_version() == 4
@@ -0,0 +1,62 @@
+from jflatdb.security import Security
+
+
+def _legacy_encrypt(security, data):
+    """Ciphertext as written by earlier versions (XOR over str(data))"""
+    return ''.join(chr(ord(c) ^ security.key) for c in str(data))
+
+
+def test_decrypt_round_trip():
+    security = Security("secret")
+    data = [{"id": 1, "name": "Zoë", "ok": True}, {"id": 2, "score": 9.5, "x": None}]
+
+    assert security.decrypt(security.encrypt(data)) == data
+    assert security.decrypt(security.encrypt_record(data[0])) == data[0]
+    assert security.decrypt("") == []
+
+
+def test_encrypt_uses_compact_json():
+    security = Security("secret")
+    data = [{"id": 1, "tags": ["a"]}]
+
+    assert security.encrypt(data).translate(security._table) == '[{"id":1,"tags":["a"]}]'
+
+
+def test_decrypt_legacy_files():
+    """Files written in the old repr format still load"""
+    security = Security("secret")
+    data = [{"id": 1, "name": "Alice", "ok": True, "x": None}]
+
+    assert security.decrypt(_legacy_encrypt(security, data)) == data
+
+
+def test_non_json_values_fall_back_to_repr():
+    security = Security("secret")
+    data = [{"id": 1, "tags": {"a"}}]
+
+    assert security.decrypt(security.encrypt(data)) == data
+
+
+def test_values_json_would_change_fall_back_to_repr():
+    """Non-str keys and tuples come back as they were stored"""
+    security = Security("secret")
+    data = [{"id": 1, "names": {1: "a", None: "b"}}, {"id": 2, "point": (1, 2)}]
+
+    assert security.decrypt(security.encrypt(data)) == data
+    assert security.decrypt(security.encrypt_record(data[1])) == data[1]
+    assert security.decrypt(security.encrypt([{"id": [[(3,)]]}])) == [{"id": [[(3,)]]}]
+
+    cycle = [{"id": 1}]
+    cycle[0]["self"] = cycle
+    assert security.encrypt(cycle).translate(security._table) == str(cycle)
+
+
+def test_xor_matches_per_character_translation():
+    """The UTF-16 byte path and the per-character table agree"""
+    texts = ["", '[{"id":1}]', "Zoë ÿ", "日本 😀", "\r\n\x00"]
+    for password in ("secret", "x", "ü" * 300):
+        security = Security(password)
+        for text in texts:
+            encrypted = security._xor(text)
+            assert encrypted == text.translate(security._table)
+            assert security._xor(encrypted) == text
@@ -1,5 +1,6 @@
 import unittest
 from jflatdb.query_engine import QueryEngine
+from jflatdb.exceptions.errors import QueryError
 
 class TestStringFunctions(unittest.TestCase):
 
@@ -30,5 +31,14 @@ class TestStringFunctions(unittest.TestCase):
     def test_trim(self):
         self.assertEqual(self.db.trim('address'), ['New Delhi', 'Mumbai', 'Pune', None])
 
+    def test_str_apply_many(self):
+        ops = ['upper', 'length', 'trim', 'lower']
+        result = self.db.str_apply_many('address', ops)
+        self.assertEqual(list(result), ops)
+        for op in ops:
+            self.assertEqual(result[op], getattr(self.db, op)('address'))
+        with self.assertRaises(QueryError):
+            self.db.str_apply_many('address', ['upper', 'reverse'])
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,8 @@
 import os
+import pytest
 from jflatdb.database import Database
 from jflatdb.transaction import Transaction, TransactionError
+from jflatdb.schema import UniqueConstraintViolation
 import jflatdb.storage as storage_module
 
 
@@ -114,6 +116,145 @@ class TestTransactionBasics:
         alice = db.find({"name": "Alice"})[0]
         assert alice["age"] == 26
 
+    def test_update_copies_records_on_write(self, tmp_path, monkeypatch):
+        """Test updates copy touched records and leave the rest shared"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 1, "name": "Alice", "age": 25})
+        db.insert({"id": 2, "name": "Bob", "age": 30})
+        alice, bob = db.data
+
+        txn = db.transaction()
+        txn.__enter__()
+        txn.update({"name": "Alice"}, {"age": 26})
+        txn.update({"age": 26}, {"age": 27})
+        assert alice == {"id": 1, "name": "Alice", "age": 25}
+        txn.rollback()
+        assert db.find({"age": 25}) == [alice]
+
+        with db.transaction() as txn:
+            txn.update({"name": "Alice"}, {"age": 26})
+        assert db.data == [{"id": 1, "name": "Alice", "age": 26}, bob]
+        assert db.data[1] is bob
+
+    def test_deep_transaction_is_isolated(self, tmp_path, monkeypatch):
+        """Test deep=True keeps outside in-place changes out of the transaction"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 1, "tags": ["a"]})
+
+        with db.transaction(deep=True) as txn:
+            db.data[0]["tags"].append("b")
+            txn.update({"id": 1}, {"name": "Alice"})
+        assert db.data == [{"id": 1, "tags": ["a"], "name": "Alice"}]
+
+    def test_commit_applies_changes_in_place(self, tmp_path, monkeypatch):
+        """Test a small transaction is applied in place and journaled once"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many({"id": i, "group": i % 3} for i in range(20))
+        db.close()
+        records = db.data
+        assert db.find({"group": 1})[0] is records[1]
+
+        with db.transaction() as txn:
+            txn.update({"id": 4}, {"group": 2})
+            txn.delete({"id": 7})
+            txn.insert({"id": 20, "group": 1})
+            txn.update({"id": 20}, {"tag": "new"})
+
+        assert db.data is records
+        assert db._journal_size == 1
+        expected = [1, 10, 13, 16, 19, 20]
+        assert [r["id"] for r in db.find({"group": 1})] == expected
+        assert [r["id"] for r in db.indexer.query({"group": 1}, use_index=False)] == expected
+        assert db.find({"id": 20}) == [{"id": 20, "group": 1, "tag": "new"}]
+
+        reopened = Database('test.json', password='test')
+        assert reopened.data == db.data
+
+    def test_lookups_follow_working_copy(self, tmp_path, monkeypatch):
+        """Test indexed lookups see the transaction's own earlier changes"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many({"id": i, "group": i % 2} for i in range(8))
+
+        with db.transaction() as txn:
+            txn.update({"group": 1}, {"group": 2})
+            txn.delete({"id": 0})
+            txn.insert({"id": 8, "group": 2, "flag": None})
+            txn.update({"group": 2, "id": 3}, {"group": 3})
+            txn.delete({"flag": None, "group": 0})
+            affected = [op.get("affected") for op in txn.get_operations()]
+            assert affected == [4, 1, None, 1, 3]
+
+        assert [(r["id"], r["group"]) for r in db.data] == [
+            (1, 2), (3, 3), (5, 2), (7, 2), (8, 2)
+        ]
+
+    def test_query_values_compared_by_equality(self, tmp_path, monkeypatch):
+        """Test None and dict query values are matched as plain values"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert({"id": 1, "meta": {"$gt": 0}})
+        db.insert({"id": 2, "meta": {"a": 1}})
+        db.insert({"id": 3})
+
+        with db.transaction() as txn:
+            txn.update({"meta": {"$gt": 0}}, {"hit": 1})
+            txn.update({"meta": None}, {"hit": 3})
+            txn.update({"id": 2, "meta": {"a": 1}}, {"hit": 2})
+
+        assert [r.get("hit") for r in db.data] == [1, 2, 3]
+
+    def test_delete_marks_records_until_commit(self, tmp_path, monkeypatch):
+        """Test deletes don't rebuild the working copy on every call"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many({"id": i} for i in range(6))
+
+        with db.transaction() as txn:
+            rows = txn._data_snapshot
+            for i in (1, 4, 1):
+                txn.delete({"id": i})
+            txn.update({"id": 4}, {"name": "gone"})
+            txn.insert({"id": 6})
+            assert txn._data_snapshot is rows and len(rows) == 7
+            assert [op.get("affected") for op in txn.get_operations()] == [
+                1, 1, 0, 0, None
+            ]
+
+        assert [r["id"] for r in db.data] == [0, 2, 3, 5, 6]
+
+    def test_insert_checks_unique_fields_of_working_copy(self, tmp_path, monkeypatch):
+        """Test inserts are checked against the transaction's own records"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.schema.add_field("email", str, unique=True)
+        db.insert({"id": 1, "email": "a@x"})
+        indexed = db.schema._indexed
+
+        with db.transaction() as txn:
+            txn.insert({"id": 2, "email": "b@x"})
+            with pytest.raises(UniqueConstraintViolation):
+                txn.insert({"id": 3, "email": "b@x"})
+            txn.delete({"email": "a@x"})
+            txn.insert({"id": 4, "email": "a@x"})
+            txn.update({"id": 4}, {"email": "c@x"})
+            txn.insert({"id": 5, "email": "a@x"})
+            assert db.schema._indexed is indexed
+
+        assert [r["id"] for r in db.data] == [2, 4, 5]
+        with pytest.raises(UniqueConstraintViolation):
+            db.insert({"id": 6, "email": "c@x"})
+
     def test_transaction_delete(self, tmp_path, monkeypatch):
         """Test transaction delete operation"""
         _patch_storage_init_to_tmp(tmp_path, monkeypatch)
@@ -237,6 +378,21 @@ class TestTransactionErrors:
         except TransactionError as e:
             assert "rolled back" in str(e)
 
+    def test_exception_in_block_propagates(self, tmp_path, monkeypatch):
+        """Test the context manager re-raises instead of swallowing errors"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        txn = db.transaction()
+
+        with pytest.raises(ValueError):
+            with txn:
+                txn.insert({"id": 1})
+                raise ValueError("boom")
+        assert txn.is_rolled_back
+        assert db.data == []
+        assert txn.__exit__(None, None, None) is False
+
 
 class TestTransactionAtomicity:
     """Test transaction atomicity guarantees"""
@@ -273,6 +429,41 @@ class TestTransactionAtomicity:
         assert len(db.data) == 1
         assert db.data[0]["id"] == 0
 
+    def test_commit_after_outside_writes_applies_snapshot(self, tmp_path, monkeypatch):
+        """Test a commit after outside writes still installs the snapshot"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many([{"name": str(i)} for i in range(20)])
+
+        with db.transaction() as txn:
+            db.delete({"name": {"$in": ["0", "1"]}})
+            db.insert({"name": "D"})
+            txn.update({"name": "5"}, {"done": True})
+
+        expected = [{"name": str(i)} for i in range(20)]
+        expected[5]["done"] = True
+        assert db.data == expected
+        assert db.find({"name": "D"}) == []
+        db.close()
+        assert Database('test.json', password='test').data == expected
+
+    def test_lookup_after_outside_delete_and_insert(self, tmp_path, monkeypatch):
+        """Test lookups don't use the database's shifted index positions"""
+        _patch_storage_init_to_tmp(tmp_path, monkeypatch)
+
+        db = Database('test.json', password='test')
+        db.insert_many([{"name": n} for n in "ABC"])
+
+        with db.transaction() as txn:
+            db.delete({"name": "A"})
+            db.insert({"name": "D"})
+            txn.update({"name": "B"}, {"done": True})
+            assert txn.get_operations()[0]["affected"] == 1
+
+        assert db.data == [{"name": "A"}, {"name": "B", "done": True}, {"name": "C"}]
+        db.close()
+
 
 class TestTransactionOperations:
     """Test transaction operation tracking"""